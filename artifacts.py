@@ -0,0 +1,121 @@
+from transaction import decode_transaction_body, get_transaction_id
+import contextlib
+import threading
+import tempfile
+import atexit
+import json
+import gzip
+import time
+import os
+
+# Memory backed, so files cardano-cli can only write to a path never reach the disk
+SCRATCH_DIRS = ['/dev/shm', tempfile.gettempdir()]
+# Archived transactions between flushes of the compressed log
+ARCHIVE_FLUSH_EVERY = 50
+
+scratch_dir = None
+archive = None
+
+"""
+Gets the scratch directory, the first of SCRATCH_DIRS that can be written to.
+
+Returns:
+    The directory path.
+"""
+def get_scratch_dir():
+    global scratch_dir
+
+    if scratch_dir is None:
+        scratch_dir = next((path for path in SCRATCH_DIRS if os.access(path, os.W_OK)), tempfile.gettempdir())
+
+    return scratch_dir
+
+"""
+Gives a uniquely named scratch file that is removed when the context exits.
+
+Workers never share a name, so concurrent builds cannot overwrite each other.
+
+Args:
+    suffix: The file suffix.
+
+Yields:
+    The filepath.
+"""
+@contextlib.contextmanager
+def scratch_file(suffix=''):
+    fd, path = tempfile.mkstemp(prefix='minter-', suffix=suffix, dir=get_scratch_dir())
+    os.close(fd)
+
+    try:
+        yield path
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+"""
+Append-only log of submitted transactions in a single gzip file.
+
+Each entry is a JSON line with the time, kind, transaction ID and the signed transaction.
+Reopening the log appends a new gzip member, which gzip readers treat as one stream.
+"""
+class TransactionArchive:
+    def __init__(self, path, flush_every=ARCHIVE_FLUSH_EVERY):
+        self.lock = threading.Lock()
+        self.file = gzip.open(path, 'ab')
+        self.flush_every = flush_every
+        self.pending = 0
+
+    """
+    Appends a transaction to the log.
+
+    Args:
+        tx: The encoded signed transaction.
+        kind: The kind of request, mint or refund.
+    """
+    def append(self, tx, kind):
+        try:
+            tx_id = get_transaction_id(decode_transaction_body(tx)[0])
+        except ValueError:
+            tx_id = None
+
+        line = json.dumps({'time': time.time(), 'kind': kind, 'tx_id': tx_id, 'cborHex': tx.hex()}) + '\n'
+
+        with self.lock:
+            self.file.write(line.encode())
+            self.pending += 1
+
+            if self.pending >= self.flush_every:
+                self.file.flush()
+                self.pending = 0
+
+    """
+    Flushes and closes the log.
+    """
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+"""
+Enables the transaction archive for the process.
+
+Args:
+    path: The filepath of the compressed log, ending in .jsonl.gz.
+"""
+def enable_archive(path):
+    global archive
+
+    archive = TransactionArchive(path)
+    atexit.register(archive.close)
+
+"""
+Archives a submitted transaction when the archive is enabled.
+
+Args:
+    tx: The encoded signed transaction.
+    kind: The kind of request, mint or refund.
+"""
+def archive_transaction(tx, kind):
+    if archive is not None:
+        archive.append(tx, kind)
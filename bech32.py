@@ -0,0 +1,113 @@
+CHARSET = 'qpzry9x8gf2tvdw0s3jn54khce6mua7l'
+GENERATOR = [0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3]
+
+"""
+Computes the bech32 checksum polymod.
+
+Args:
+    values: The 5-bit values.
+
+Returns:
+    The polymod.
+"""
+def polymod(values):
+    checksum = 1
+
+    for value in values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1ffffff) << 5 ^ value
+
+        for x in range(5):
+            if (top >> x) & 1:
+                checksum ^= GENERATOR[x]
+
+    return checksum
+
+"""
+Expands the human readable part for the checksum.
+"""
+def expand_hrp(hrp):
+    return [ord(char) >> 5 for char in hrp] + [0] + [ord(char) & 31 for char in hrp]
+
+"""
+Regroups a list of bit groups.
+
+Args:
+    data: The groups to convert.
+    from_bits: The size of the input groups.
+    to_bits: The size of the output groups.
+    pad: Whether to pad the last output group.
+
+Returns:
+    The converted groups.
+
+Raises:
+    ValueError: Raised when the padding is invalid.
+"""
+def convert_bits(data, from_bits, to_bits, pad):
+    accumulator = 0
+    bits = 0
+    result = []
+    mask = (1 << to_bits) - 1
+
+    for value in data:
+        accumulator = accumulator << from_bits | value
+        bits += from_bits
+
+        while bits >= to_bits:
+            bits -= to_bits
+            result.append(accumulator >> bits & mask)
+
+    if pad and bits:
+        result.append(accumulator << (to_bits - bits) & mask)
+    elif not pad and (bits >= from_bits or accumulator << (to_bits - bits) & mask):
+        raise ValueError('Invalid bech32 padding')
+
+    return result
+
+"""
+Decodes a bech32 string such as a Shelley address.
+
+Args:
+    text: The bech32 string.
+
+Returns:
+    The human readable part and the decoded bytes.
+
+Raises:
+    ValueError: Raised when the string is not valid bech32.
+"""
+def decode(text):
+    text = text.lower()
+    separator = text.rfind('1')
+
+    if separator < 1 or len(text) - separator < 7:
+        raise ValueError(f'Invalid bech32 string: {text}')
+
+    hrp = text[:separator]
+
+    try:
+        data = [CHARSET.index(char) for char in text[separator+1:]]
+    except ValueError:
+        raise ValueError(f'Invalid bech32 character in {text}')
+
+    if polymod(expand_hrp(hrp) + data) != 1:
+        raise ValueError(f'Invalid bech32 checksum: {text}')
+
+    return hrp, bytes(convert_bits(data[:-6], 5, 8, False))
+
+"""
+Encodes bytes as a bech32 string.
+
+Args:
+    hrp: The human readable part.
+    data: The bytes to encode.
+
+Returns:
+    The bech32 string.
+"""
+def encode(hrp, data):
+    values = convert_bits(data, 8, 5, True)
+    checksum = polymod(expand_hrp(hrp) + values + [0] * 6) ^ 1
+    values += [(checksum >> 5 * (5 - x)) & 31 for x in range(6)]
+    return hrp + '1' + ''.join(CHARSET[value] for value in values)
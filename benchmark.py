@@ -0,0 +1,448 @@
+from monitor_mint_transactions import FEE, monitor, refund_late_minters
+from fake_cardano_cli import CALLS_FILE, with_utxos
+from image_cache import get_image_cache
+from policy import build_policy_script, get_script_policy_id
+from pricing import Pricing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import resource
+import random
+import tempfile
+import hashlib
+import bech32
+import shutil
+import json
+import time
+import sys
+import os
+
+FAKE_CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_cardano_cli.py')
+IMAGE_COUNT = 20
+IMAGE_SIZE = 4096
+# Mainnet parameters at the start of the Alonzo era
+PROTOCOL_PARAMETERS = {'txFeePerByte': 44, 'txFeeFixed': 155381, 'utxoCostPerWord': 34482}
+
+"""
+Stand-in for the Blockfrost IPFS and transaction endpoints.
+
+Every request is counted per endpoint and delayed by the configured latency.
+"""
+class FakeBlockfrost(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0):
+        super().__init__(('127.0.0.1', 0), FakeBlockfrostHandler)
+        self.latency = latency
+        self.payers = dict()
+        self.counts = dict()
+        self.lock = threading.Lock()
+
+    """
+    Gets the base URL the Blockfrost client should use.
+    """
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/'
+
+    """
+    Counts a request to an endpoint.
+
+    Args:
+        endpoint: The endpoint without its path parameters.
+    """
+    def count(self, endpoint):
+        with self.lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+class FakeBlockfrostHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+
+        if len(parts) == 3 and parts[0] == 'txs' and parts[2] == 'utxos':
+            self.server.count('txs/utxos')
+            payer = self.server.payers.get(parts[1])
+
+            if payer is None:
+                return self.respond(404, {'status_code': 404, 'error': 'Not Found'})
+
+            return self.respond(200, {'hash': parts[1], 'inputs': [{'address': payer}], 'outputs': []})
+
+        self.respond(404, {'status_code': 404, 'error': 'Not Found'})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        if self.path.strip('/') == 'ipfs/add':
+            self.server.count('ipfs/add')
+            hash = 'Qm' + hashlib.sha256(body).hexdigest()[:44]
+            return self.respond(200, {'name': 'image', 'Hash': hash, 'ipfs_hash': hash, 'size': len(body)})
+        elif self.path.strip('/').startswith('ipfs/pin/add/'):
+            self.server.count('ipfs/pin/add')
+            return self.respond(200, {'ipfs_hash': self.path.rsplit('/', 1)[1], 'state': 'queued'})
+
+        self.respond(404, {'status_code': 404, 'error': 'Not Found'})
+
+    """
+    Sends a JSON response after the configured latency.
+
+    Args:
+        status: The HTTP status code.
+        body: The response body.
+    """
+    def respond(self, status, body):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+"""
+Generates a random mainnet enterprise address.
+
+Returns:
+    The address in bech32.
+"""
+def random_address():
+    return bech32.encode('addr', bytes([0x61]) + os.urandom(28))
+
+"""
+Creates a minting directory with keys, a policy, protocol parameters, images and a
+cardano-cli executable that runs fake_cardano_cli.py.
+
+Args:
+    path: The directory to create.
+    images: The number of images to create.
+
+Returns:
+    The minting address.
+"""
+def setup_workspace(path, images=IMAGE_COUNT):
+    for directory in ['policy', 'metadata', 'img', 'fake_chain', 'bin']:
+        os.makedirs(f'{path}/{directory}', exist_ok=True)
+
+    address = random_address()
+
+    with open(f'{path}/payment.addr', 'w') as file:
+        file.write(address)
+
+    with open(f'{path}/payment.skey', 'w') as file:
+        json.dump({'type': 'PaymentSigningKeyShelley_ed25519', 'description': 'Payment Signing Key',
+            'cborHex': '5820' + os.urandom(32).hex()}, file)
+
+    script = build_policy_script(os.urandom(28).hex(), 2**32-1)
+
+    with open(f'{path}/policy/policy.script', 'w') as file:
+        json.dump(script, file)
+
+    with open(f'{path}/policy/policyID', 'w') as file:
+        file.write(get_script_policy_id(script))
+
+    with open(f'{path}/policy/policy.skey', 'w') as file:
+        json.dump(dict(), file)
+
+    with open(f'{path}/protocol.json', 'w') as file:
+        json.dump(PROTOCOL_PARAMETERS, file)
+
+    for x in range(images):
+        with open(f'{path}/img/image{x}.png', 'wb') as file:
+            file.write(os.urandom(IMAGE_SIZE))
+
+    with open(f'{path}/bin/cardano-cli', 'w') as file:
+        file.write(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_CLI_PATH}" "$@"\n')
+
+    os.chmod(f'{path}/bin/cardano-cli', 0o755)
+    return address
+
+"""
+Sends a burst of mint requests to the minting address on the fake chain.
+
+Args:
+    address: The minting address.
+    count: The number of requests.
+    rate: The requests per second, all requests arrive at once when 0.
+    blockfrost: The fake Blockfrost server that resolves the payers.
+    arrivals: A dict the arrival time of every request is added to, keyed by UTxO.
+    quantities: The number of NFTs each request pays for, one each when None.
+"""
+def send_requests(address, count, rate, blockfrost, arrivals, quantities=None):
+    requests = []
+    amounts = dict()
+
+    for x in range(count):
+        tx_hash = os.urandom(32).hex()
+        blockfrost.payers[tx_hash] = random_address()
+        requests.append(f'{tx_hash}#0')
+        amounts[f'{tx_hash}#0'] = int(FEE) * (quantities[x] if quantities else 1)
+
+    def add(keys):
+        def change(utxos):
+            for key in keys:
+                utxos[key] = {'address': address, 'value': {'lovelace': amounts[key]}}
+            return True
+        return change
+
+    if not rate:
+        with_utxos(add(requests), './fake_chain')
+        now = time.time()
+        arrivals.update((key, now) for key in requests)
+        return
+
+    for key in requests:
+        with_utxos(add([key]), './fake_chain')
+        arrivals[key] = time.time()
+        time.sleep(1 / rate)
+
+"""
+Reads the call log of the fake cardano-cli.
+
+Returns:
+    A list of the logged calls.
+"""
+def read_calls():
+    try:
+        with open(f'./fake_chain/{CALLS_FILE}', 'r') as file:
+            return [json.loads(line) for line in file if line.strip()]
+    except FileNotFoundError:
+        return []
+
+"""
+Gets a percentile with the nearest-rank method.
+
+Args:
+    values: The values.
+    percent: The percentile between 0 and 100.
+
+Returns:
+    The percentile or None if there are no values.
+"""
+def percentile(values, percent):
+    if not values:
+        return None
+
+    values = sorted(values)
+    return values[max(0, -(-len(values) * percent // 100) - 1)]
+
+"""
+Summarizes the submissions of a phase.
+
+Args:
+    calls: The logged cardano-cli calls.
+    arrivals: The arrival time of every request of the phase, keyed by UTxO.
+
+Returns:
+    The number of requests submitted, the requests per minute and the p50 and p99
+    request-to-submit latency in seconds.
+"""
+def summarize(calls, arrivals):
+    submitted = dict()
+
+    for call in calls:
+        if call['command'] == 'transaction submit':
+            for key in call['spent']:
+                if key in arrivals:
+                    submitted[key] = call['time']
+
+    if not submitted:
+        return {'submitted': 0, 'per_minute': 0, 'p50': None, 'p99': None}
+
+    latencies = [submitted[key] - arrivals[key] for key in submitted]
+    elapsed = max(submitted.values()) - min(arrivals.values())
+
+    return {
+        'submitted': len(submitted),
+        'per_minute': len(submitted) * 60 / elapsed if elapsed > 0 else 0,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99)
+    }
+
+"""
+Runs a phase in a thread so a stuck phase cannot hang the benchmark.
+
+Args:
+    target: The phase function.
+    args: The arguments of the phase.
+    timeout: The time in seconds the phase may take.
+
+Returns:
+    A boolean indicating whether the phase finished in time.
+"""
+def run_phase(target, args, timeout):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+"""
+Replays a synthetic burst of mint requests and late requests through the minter
+against a fake cardano-cli and a fake Blockfrost.
+
+Both phases run on mainnet so payers are resolved through the fake Blockfrost.
+
+Args:
+    requests: The number of mint requests.
+    refunds: The number of late requests sent after the mint.
+    rate: The requests per second, all requests arrive at once when 0.
+    batch_size: The maximum number of mint requests combined into one transaction.
+    pipeline: Whether to mint with the pipelined minter.
+    cli_latency: The latency in seconds of every cardano-cli call.
+    api_latency: The latency in seconds of every Blockfrost request.
+    drop_rate: The share of submitted transactions the fake node silently drops.
+    refund_time: The time in seconds to monitor for late minters.
+    refund_window: The time in seconds a late payment may wait to be refunded with others.
+    warm_up: The number of NFT IDs to prepare templates for ahead of time, 0 to disable.
+    max_quantity: The most NFTs a mint request pays for, each pays for a random quantity up to it.
+    timeout: The time in seconds the mint phase may take.
+    path: The directory to run in, a temporary directory when None.
+
+Returns:
+    The benchmark report.
+"""
+def run_benchmark(requests=100, refunds=10, rate=0, batch_size=1, pipeline=False, cli_latency=0,
+    api_latency=0, drop_rate=0, refund_time=15, refund_window=5, warm_up=0, max_quantity=1, timeout=600,
+    path=None):
+    workspace = path or tempfile.mkdtemp(prefix='bench')
+    cwd = os.getcwd()
+    address = setup_workspace(workspace)
+    blockfrost = FakeBlockfrost(api_latency)
+    threading.Thread(target=blockfrost.serve_forever, daemon=True).start()
+
+    os.environ['PATH'] = f'{os.path.abspath(workspace)}/bin{os.pathsep}{os.environ["PATH"]}'
+    os.environ['FAKE_CLI_DIR'] = f'{os.path.abspath(workspace)}/fake_chain'
+    os.environ['FAKE_CLI_LATENCY'] = str(cli_latency)
+    os.environ['FAKE_CLI_DROP_RATE'] = str(drop_rate)
+    os.environ['BLOCKFROST_API_URL'] = blockfrost.url
+    os.chdir(workspace)
+
+    try:
+        mint_arrivals = dict()
+        refund_arrivals = dict()
+        quantities = [random.randint(1, max_quantity) for _ in range(requests)]
+        pricing = Pricing(int(FEE), max_quantity)
+        sender = threading.Thread(target=send_requests,
+            args=(address, requests, rate, blockfrost, mint_arrivals, quantities))
+        sender.start()
+
+        if pipeline:
+            from mint_pipeline import run_pipeline
+            finished = run_phase(lambda: run_pipeline(1, requests, 'mainnet', warm_up=warm_up), (), timeout)
+        else:
+            finished = run_phase(lambda: monitor(1, sum(quantities), 'mainnet', batch_size, warm_up=warm_up,
+                pricing=pricing), (), timeout)
+
+        sender.join()
+
+        if finished and refunds:
+            sender = threading.Thread(target=send_requests,
+                args=(address, refunds, rate, blockfrost, refund_arrivals))
+            sender.start()
+            refund_late_minters(refund_time, 'mainnet', window=refund_window, pricing=pricing)
+            sender.join()
+
+        calls = read_calls()
+        commands = dict()
+
+        for call in calls:
+            commands[call['command']] = commands.get(call['command'], 0) + 1
+
+        return {
+            'finished': finished,
+            'mint': summarize(calls, mint_arrivals),
+            'refund': summarize(calls, refund_arrivals),
+            'cardano_cli_calls': commands,
+            'blockfrost_requests': dict(blockfrost.counts),
+            'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'max_child_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        }
+    finally:
+        get_image_cache().flush()
+        os.chdir(cwd)
+        blockfrost.shutdown()
+
+        if path is None:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+"""
+Prints a benchmark report.
+
+Args:
+    report: The benchmark report.
+"""
+def print_report(report):
+    if not report['finished']:
+        print('Mint phase timed out, the numbers below are partial.')
+
+    for phase in ['mint', 'refund']:
+        summary = report[phase]
+        print(f'{phase}: {summary["submitted"]} submitted, {summary["per_minute"]:.1f}/min', end='')
+
+        if summary['submitted']:
+            print(f', p50 {summary["p50"]:.2f}s, p99 {summary["p99"]:.2f}s')
+        else:
+            print()
+
+    print(f'cardano-cli calls: {sum(report["cardano_cli_calls"].values())}')
+
+    for command, count in sorted(report['cardano_cli_calls'].items()):
+        print(f'  {command}: {count}')
+
+    print(f'Blockfrost requests: {sum(report["blockfrost_requests"].values())}')
+
+    for endpoint, count in sorted(report['blockfrost_requests'].items()):
+        print(f'  {endpoint}: {count}')
+
+    print(f'max RSS: {report["max_rss_mb"]:.1f} MB, max cardano-cli RSS: {report["max_child_rss_mb"]:.1f} MB')
+
+if __name__ == '__main__':
+    options = dict()
+    output = None
+
+    for x in range(0,len(sys.argv)):
+        if sys.argv[x] == '--requests':
+            options['requests'] = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--refunds':
+            options['refunds'] = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--rate':
+            options['rate'] = float(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--batch-size':
+            options['batch_size'] = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--pipeline':
+            options['pipeline'] = sys.argv[x+1].strip().lower() == 'true'
+        elif sys.argv[x] == '--cli-latency':
+            options['cli_latency'] = float(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--api-latency':
+            options['api_latency'] = float(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--drop-rate':
+            options['drop_rate'] = float(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--refund-time':
+            options['refund_time'] = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--refund-window':
+            options['refund_window'] = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--warm-up':
+            options['warm_up'] = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--max-quantity':
+            options['max_quantity'] = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--timeout':
+            options['timeout'] = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--dir':
+            options['path'] = sys.argv[x+1].strip()
+        elif sys.argv[x] == '--out-file':
+            output = sys.argv[x+1].strip()
+
+    assert options.get('requests', 1) >= 1, f'Invalid argument for requests: {options.get("requests")}'
+    assert options.get('refunds', 0) >= 0, f'Invalid argument for refunds: {options.get("refunds")}'
+    assert options.get('max_quantity', 1) >= 1, f'Invalid argument for max quantity: {options.get("max_quantity")}'
+    assert not options.get('pipeline') or options.get('max_quantity', 1) == 1, 'The pipeline only mints single NFTs'
+
+    report = run_benchmark(**options)
+    print_report(report)
+
+    if output:
+        with open(output, 'w') as file:
+            json.dump(report, file, indent=2)
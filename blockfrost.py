@@ -0,0 +1,198 @@
+from requests.adapters import HTTPAdapter
+from metrics import BLOCKFROST_REQUESTS, BLOCKFROST_RETRIES, BLOCKFROST_SECONDS
+import threading
+import requests
+import random
+import time
+import os
+
+API_URL = 'https://ipfs.blockfrost.io/api/v0/'
+
+# Blockfrost allows 10 requests per second with a burst of 500
+RATE_LIMIT = 10
+RATE_BURST = 500
+RETRIES = 5
+BACKOFF = 0.5
+TIMEOUT = 30
+POOL_SIZE = 10
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Path segments at least this long are hashes or CIDs and left out of metric labels
+ID_LENGTH = 20
+
+"""
+Gets the metric label of an endpoint, replacing hashes and CIDs with a placeholder.
+
+Args:
+    endpoint: The endpoint relative to the base URL.
+
+Returns:
+    The endpoint label, such as txs/{id}/utxos.
+"""
+def endpoint_label(endpoint):
+    return '/'.join('{id}' if len(part) >= ID_LENGTH else part for part in endpoint.strip('/').split('/'))
+
+"""
+Token bucket limiting the request rate.
+"""
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    """
+    Takes a token, waiting until one is available.
+    """
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+"""
+Blockfrost API client sharing pooled keep-alive connections between threads.
+
+Requests are rate limited with a token bucket and transient errors, including 429
+responses, are retried with jittered exponential backoff.
+"""
+class BlockfrostClient:
+    def __init__(self, base_url=API_URL, project_id=None, rate=RATE_LIMIT, burst=RATE_BURST,
+        retries=RETRIES, timeout=TIMEOUT):
+        self.base_url = base_url
+        self.retries = retries
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+        self.session = requests.Session()
+        self.session.headers['project_id'] = project_id or os.getenv('PROJECT_ID') or ''
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    """
+    Sends a request to the Blockfrost API.
+
+    Args:
+        method: The HTTP method.
+        endpoint: The endpoint relative to the base URL.
+        kwargs: Extra arguments for requests, such as files.
+
+    Returns:
+        The JSON response or a dict with an error if every attempt failed.
+    """
+    def request(self, method, endpoint, **kwargs):
+        label = endpoint_label(endpoint)
+        start = time.perf_counter()
+
+        try:
+            response = self.send(method, endpoint, label, **kwargs)
+        finally:
+            BLOCKFROST_SECONDS.observe(time.perf_counter() - start, endpoint=label)
+
+        BLOCKFROST_REQUESTS.inc(endpoint=label, status='error' if 'error' in response else 'ok')
+        return response
+
+    """
+    Sends a request with retries.
+
+    Args:
+        method: The HTTP method.
+        endpoint: The endpoint relative to the base URL.
+        label: The metric label of the endpoint.
+        kwargs: Extra arguments for requests, such as files.
+
+    Returns:
+        The JSON response or a dict with an error if every attempt failed.
+    """
+    def send(self, method, endpoint, label, **kwargs):
+        error = None
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                BLOCKFROST_RETRIES.inc(endpoint=label)
+                time.sleep(self.backoff(attempt, error))
+
+            for file in kwargs.get('files', dict()).values():
+                if hasattr(file, 'seek'):
+                    file.seek(0)
+
+            self.bucket.acquire()
+
+            try:
+                response = self.session.request(method, self.base_url + endpoint,
+                    timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                continue
+
+            if response.status_code in RETRY_STATUSES:
+                error = response
+                continue
+
+            try:
+                return response.json()
+            except ValueError:
+                return {'error': f'Invalid response with status {response.status_code}'}
+
+        if isinstance(error, requests.Response):
+            return {'error': f'Request failed with status {error.status_code}'}
+
+        return {'error': f'Request failed: {error}'}
+
+    """
+    Gets the delay before a retry, honouring the Retry-After header of 429 responses.
+
+    Args:
+        attempt: The number of the retry.
+        error: The failed response or exception.
+
+    Returns:
+        The delay in seconds.
+    """
+    def backoff(self, attempt, error):
+        if isinstance(error, requests.Response) and error.headers.get('Retry-After', '').isdigit():
+            return int(error.headers['Retry-After'])
+
+        return random.uniform(0, BACKOFF * 2**attempt)
+
+    """
+    Sends a GET request to the Blockfrost API.
+    """
+    def get(self, endpoint, **kwargs):
+        return self.request('GET', endpoint, **kwargs)
+
+    """
+    Sends a POST request to the Blockfrost API.
+    """
+    def post(self, endpoint, **kwargs):
+        return self.request('POST', endpoint, **kwargs)
+
+client = None
+client_lock = threading.Lock()
+
+"""
+Gets the Blockfrost client shared by the process.
+
+The base URL can be pointed at another server with the BLOCKFROST_API_URL variable.
+
+Returns:
+    The Blockfrost client.
+"""
+def get_client():
+    global client
+
+    with client_lock:
+        if client is None:
+            client = BlockfrostClient(os.getenv('BLOCKFROST_API_URL', API_URL))
+
+    return client
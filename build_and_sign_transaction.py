@@ -1,10 +1,52 @@
-from generate_metadata import METADATA_DIR, generate_metadata
-from helpers import POLICY_DIR, MAGIC, get_slot_number, get_policy_id
+from generate_metadata import generate_metadata
+from helpers import POLICY_DIR, MAGIC, get_slot_number, run_cardano_cli
+from policy import get_policy_id, get_policy_script_size
+from compact_metadata import compact_metadata, predict_mint_transaction
+from fees import calculate_min_utxo, calculate_transaction_fee, estimate_transaction_size
+from transaction import build_transaction_body, get_transaction_envelope, get_transaction_fee, sign_transaction_body
+from metrics import FEES_PAID, STAGE_SECONDS, TRANSACTIONS, timed
+from artifacts import archive_transaction, scratch_file
 import subprocess
+import json
 
-OUT_DIR = './matx'
-REFUND_DIR = './refund'
 SLOT_MARGIN = 10000
+# Oldest tip (in seconds) a TTL may be estimated from, a small fraction of SLOT_MARGIN
+TIP_MAX_AGE = SLOT_MARGIN // 100
+MAX_TX_SIZE = 16384
+
+"""
+Runs transaction build or build-raw, passing the metadata through stdin.
+
+cardano-cli only writes the body to a path, so it goes to a scratch file that is read
+back and removed right away.
+
+Args:
+    args: The build arguments, without the metadata and out file.
+    metadata: The transaction metadata in JSON format.
+    raw: Whether the arguments are for build-raw, which prints no fee estimate.
+
+Returns:
+    The transaction body text envelope or False if the build was not successful.
+"""
+def run_transaction_build(args, metadata, raw=False):
+    with scratch_file('.raw') as out_file:
+        args = args + ['--metadata-json-file', '/dev/stdin', '--out-file', out_file]
+
+        try:
+            res = run_cardano_cli(args, input=json.dumps(compact_metadata(metadata)).encode())
+
+            if res.stderr.decode():
+                print(res.stderr.decode())
+                return False
+        except subprocess.CalledProcessError:
+            return False
+
+        if not raw and res.stdout.decode().split(':')[0] != 'Estimated transaction fee':
+            print(res.stdout.decode())
+            return False
+
+        with open(out_file, 'r') as file:
+            return file.read()
 
 """
 Builds the minting transaction.
@@ -15,13 +57,14 @@ Args:
     addr_in: The address which requested the mint.
     addr_out: The address to send the change to.
     id: The ID of the NFT.
-    output: The accompanying ADA (in Lovelace) sent with the NFT to meet UTxO requirement.
+    output: The accompanying ADA (in Lovelace) sent with the NFT, defaults to the minimum UTxO value.
     chain: The Cardano chain.
 
 Returns:
-    A boolean indicating whether the transaction was successful.
+    The transaction body text envelope or False if the build was not successful.
 """
-def build_transaction(tx_hash, tx_ix, addr_in, addr_out, id ,output='1400000', chain='testnet-magic'):
+@timed(STAGE_SECONDS, stage='build')
+def build_transaction(tx_hash, tx_ix, addr_in, addr_out, id ,output=None, chain='testnet-magic'):
     args = ['cardano-cli', 'transaction', 'build', f'--{chain}']
 
     if chain == 'testnet-magic':
@@ -42,42 +85,31 @@ def build_transaction(tx_hash, tx_ix, addr_in, addr_out, id ,output='1400000', c
 
     if policy_id:
         token_name = list(metadata['721'][policy_id].keys())[0].encode('utf-8').hex()
+
+        if output is None:
+            output = calculate_min_utxo({policy_id: {token_name: 1}})
+
+            if not output:
+                print('Error when calculating minimum UTxO...')
+                return False
+
         args.append(f'{addr_in}+{output}+1 {policy_id}.{token_name}')
         args.append('--change-address')
         args.append(addr_out)
         args.append(f'--mint=1 {policy_id}.{token_name}')
         args.append('--minting-script-file')
         args.append(f'{POLICY_DIR}/policy.script')
-        args.append('--metadata-json-file')
-        args.append(f'{METADATA_DIR}/metadata{id}.json')
         args.append('--invalid-hereafter')
 
-        slot_number = get_slot_number(chain)
+        slot_number = get_slot_number(chain, TIP_MAX_AGE)
 
         if slot_number:
             args.append(f'{slot_number+SLOT_MARGIN}')
 
             args.append('--witness-override')
             args.append('2')
-            args.append('--out-file')
-            args.append(f'{OUT_DIR}/matx{id}.raw')
-            
-            try:
-                res = subprocess.run(args, capture_output=True)
-
-                if res.stderr.decode():
-                    print(res.stderr.decode())
-                    return False
-            except subprocess.CalledProcessError:
-                return False
 
-            res_split = res.stdout.decode().split(':')
-
-            if res_split[0] == 'Minimum required UTxO':
-                output = res_split[1].split()[1]
-                return build_transaction(tx_hash, tx_ix, addr_in, addr_out, id, output, chain)
-            elif res_split[0] == 'Estimated transaction fee':
-                return True
+            return run_transaction_build(args, metadata)
         else:
             print('Error when getting slot number...')
     else:
@@ -86,16 +118,194 @@ def build_transaction(tx_hash, tx_ix, addr_in, addr_out, id ,output='1400000', c
     return False
 
 """
-Signs the minting transaction.
+Builds the minting transaction from a prepared template with an explicit fee.
+
+Only the input, payer address and TTL are bound, build-raw needs no node round trip
+to balance the transaction.
 
 Args:
-    id: The NFT ID.
+    template: The mint template of the NFT.
+    tx_hash: The input transaction hash.
+    tx_ix: The input tx_ix.
+    lovelace: The amount of ADA (in Lovelace) in the input.
+    addr_in: The address which requested the mint.
+    addr_out: The address to send the change to.
     chain: The Cardano chain.
 
 Returns:
-    A boolean indicating whether the transaction was successful.
+    The transaction body text envelope or False if the build was not successful.
+"""
+@timed(STAGE_SECONDS, stage='build')
+def build_template_transaction(template, tx_hash, tx_ix, lovelace, addr_in, addr_out, chain='testnet-magic'):
+    change = lovelace - template.output - template.fee
+    min_change = calculate_min_utxo()
+
+    if not min_change or change < min_change:
+        print('Error when calculating the change of a templated mint...')
+        return False
+
+    slot_number = get_slot_number(chain, TIP_MAX_AGE)
+
+    if not slot_number:
+        print('Error when getting slot number...')
+        return False
+
+    asset = f'{template.policy_id}.{template.token_name}'
+    args = ['cardano-cli', 'transaction', 'build-raw', '--alonzo-era']
+    args.append('--tx-in')
+    args.append(f'{tx_hash}#{tx_ix}')
+    args.append('--tx-out')
+    args.append(f'{addr_in}+{template.output}+1 {asset}')
+    args.append('--tx-out')
+    args.append(f'{addr_out}+{change}')
+    args.append(f'--mint=1 {asset}')
+    args.append('--minting-script-file')
+    args.append(f'{POLICY_DIR}/policy.script')
+    args.append('--invalid-hereafter')
+    args.append(f'{slot_number+SLOT_MARGIN}')
+    args.append('--fee')
+    args.append(str(template.fee))
+
+    return run_transaction_build(args, template.metadata, raw=True)
+
+"""
+Builds a single minting transaction for several mint requests.
+
+Each request input is consumed, its quantity of NFTs is minted and sent to its payer
+together with its refund and the change is sent to addr_out. Requests are added in
+order until the predicted transaction size would exceed MAX_TX_SIZE. The policy.script
+file is needed to predict the size, a policy given only by its policyID file is refused.
+
+Args:
+    requests: A list of (tx_hash, tx_ix, addr_in, quantity, refund) tuples for the mint requests.
+    addr_out: The address to send the change to.
+    id: The ID of the first NFT, the following NFTs get consecutive IDs.
+    output: The accompanying ADA (in Lovelace) sent with the NFTs of a request, defaults to the minimum UTxO value.
+    chain: The Cardano chain.
+
+Returns:
+    A (count, body) tuple with the number of requests included and the transaction body
+    text envelope or False if the build was not successful.
+"""
+@timed(STAGE_SECONDS, stage='build')
+def build_batch_transaction(requests, addr_out, id, output=None, chain='testnet-magic'):
+    policy_id = get_policy_id()
+    script_size = get_policy_script_size()
+
+    if not policy_id:
+        print('Error when getting policy ID...')
+        return False
+
+    if script_size is None:
+        print('Error when reading policy.script, batches need the policy script to predict their size...')
+        return False
+
+    batch_metadata = {'721': {policy_id: {}}}
+    token_outputs = []
+    tx_ins = []
+    tx_outs = []
+    mints = []
+
+    for x, (tx_hash, tx_ix, addr_in, quantity, refund) in enumerate(requests):
+        assets = dict()
+
+        for nft_id in range(id+len(mints), id+len(mints)+quantity):
+            metadata = generate_metadata(nft_id)
+
+            if not metadata:
+                print('Error getting metadata...')
+                return False
+
+            assets.update(metadata['721'][policy_id])
+
+        if len(assets) != quantity:
+            print('Error getting metadata...')
+            return False
+
+        batch_metadata['721'][policy_id].update(assets)
+        token_names = [name.encode('utf-8').hex() for name in assets]
+
+        try:
+            size, _ = predict_mint_transaction(compact_metadata(batch_metadata), token_outputs + [token_names],
+                addr_out, script_size)
+        except ValueError as e:
+            print(e)
+            return False
+
+        if size > MAX_TX_SIZE:
+            if x == 0:
+                print(f'Error: a request for {quantity} NFTs alone exceeds the maximum transaction size...')
+                return False
+
+            for name in assets:
+                del batch_metadata['721'][policy_id][name]
+            break
+
+        token_outputs.append(token_names)
+        token_output = output
+
+        if token_output is None:
+            token_output = calculate_min_utxo({policy_id: {token_name: 1 for token_name in token_names}})
+
+            if not token_output:
+                print('Error when calculating minimum UTxO...')
+                return False
+
+        tokens = '+'.join(f'1 {policy_id}.{token_name}' for token_name in token_names)
+        tx_ins.append(f'{tx_hash}#{tx_ix}')
+        tx_outs.append((addr_in, f'{token_output+refund}+{tokens}'))
+        mints += [f'1 {policy_id}.{token_name}' for token_name in token_names]
+
+    slot_number = get_slot_number(chain, TIP_MAX_AGE)
+
+    if not slot_number:
+        print('Error when getting slot number...')
+        return False
+
+    args = ['cardano-cli', 'transaction', 'build', f'--{chain}']
+
+    if chain == 'testnet-magic':
+        args.append(MAGIC)
+
+    args.append('--alonzo-era')
+
+    for tx_in in tx_ins:
+        args.append('--tx-in')
+        args.append(tx_in)
+
+    for addr_in, value in tx_outs:
+        args.append('--tx-out')
+        args.append(f'{addr_in}+{value}')
+
+    args.append('--change-address')
+    args.append(addr_out)
+    args.append(f'--mint={"+".join(mints)}')
+    args.append('--minting-script-file')
+    args.append(f'{POLICY_DIR}/policy.script')
+    args.append('--invalid-hereafter')
+    args.append(f'{slot_number+SLOT_MARGIN}')
+    args.append('--witness-override')
+    args.append('2')
+
+    body = run_transaction_build(args, batch_metadata)
+
+    if not body:
+        return False
+
+    return len(tx_ins), body
+
+"""
+Signs the minting transaction, piping the body in and the signed transaction out.
+
+Args:
+    body: The transaction body text envelope.
+    chain: The Cardano chain.
+
+Returns:
+    The encoded signed transaction or False if the signing was not successful.
 """
-def sign_transaction(id, chain='testnet-magic'):
+@timed(STAGE_SECONDS, stage='sign')
+def sign_transaction(body, chain='testnet-magic'):
     args = ['cardano-cli', 'transaction', 'sign', '--signing-key-file', 'payment.skey', 
         '--signing-key-file', f'{POLICY_DIR}/policy.skey', f'--{chain}']
     
@@ -103,165 +313,149 @@ def sign_transaction(id, chain='testnet-magic'):
         args.append(MAGIC)
     
     args.append('--tx-body-file')
-    args.append(f'{OUT_DIR}/matx{id}.raw')
+    args.append('/dev/stdin')
     args.append('--out-file')
-    args.append(f'{OUT_DIR}/matx{id}.signed')
+    args.append('/dev/stdout')
     
     try:
-        res = subprocess.run(args, capture_output=True).stderr.decode()
+        res = run_cardano_cli(args, input=body.encode())
 
-        if res:
-            print(res)
+        if res.stderr.decode():
+            print(res.stderr.decode())
             return False
 
-        return True
-    except subprocess.CalledProcessError:
+        return bytes.fromhex(json.loads(res.stdout.decode())['cborHex'])
+    except (subprocess.CalledProcessError, ValueError, KeyError):
         return False
 
 """
-Submits a transaction to the Cardano blockchain.
+Counts a submitted transaction and the fee it paid and archives it.
 
 Args:
-    tx_file_path: The filepath for the transaction.
+    tx: The encoded signed transaction.
+    kind: The kind of request, mint or refund.
+"""
+def count_submission(tx, kind):
+    TRANSACTIONS.inc()
+    archive_transaction(tx, kind)
+
+    try:
+        FEES_PAID.inc(get_transaction_fee(tx))
+    except ValueError:
+        print('Error reading the fee of a submitted transaction...')
+
+"""
+Submits a signed transaction to the Cardano blockchain without writing it to disk.
+
+Args:
+    tx: The encoded signed transaction.
     chain: The Cardano chain.
+    kind: The kind of request, mint or refund.
 
 Returns:
     A boolean indicating whether the transaction was successful.
 """
-def submit_transaction(tx_file_path, chain='testnet-magic'):
-    args = ['cardano-cli', 'transaction', 'submit', '--tx-file', 
-        tx_file_path, f'--{chain}']
+@timed(STAGE_SECONDS, stage='submit')
+def submit_transaction_bytes(tx, chain='testnet-magic', kind='mint'):
+    args = ['cardano-cli', 'transaction', 'submit', '--tx-file', '/dev/stdin', f'--{chain}']
 
     if chain == 'testnet-magic':
         args.append(MAGIC)
-    
+
     try:
-        res = subprocess.run(args, capture_output=True)
-        
+        res = run_cardano_cli(args, input=get_transaction_envelope(tx).encode())
+
         if res.stdout.decode().strip() == 'Transaction successfully submitted.':
+            count_submission(tx, kind)
             return True
-        
+
         print(res.stderr.decode())
         return False
     except subprocess.CalledProcessError:
         return False
 
 """
-Calculates the fee for a refund transaction.
+Splits refunds into groups that each fit in a transaction of at most max_size bytes.
 
 Args:
-    tx_hash: The input transaction hash.
-    tx_ix: The input tx_ix.
-    addr_in: The address which requested the mint.
-    addr_out: The address to send the change to.
-    output: The amount of ADA (in Lovelace) sent by the minter.
-    chain: The Cardano chain.
+    refunds: A list of (tx_hash, tx_ix, addr_in, amount) tuples.
+    max_size: The maximum transaction size in bytes.
 
 Returns:
-    The transaction fee in Lovelace or False if the calculation was not successful.
+    A list of refund groups.
 """
-def calculate_refund_transaction_fee(tx_hash, tx_ix, addr_in, output, chain='testnet-magic'):
-    raw_args = ['cardano-cli', 'transaction', 'build-raw', '--tx-in', f'{tx_hash}#{tx_ix}',
-        '--tx-out', f'{addr_in}+{output}', '--ttl', '0', '--fee', '0', '--out-file', 
-        f'{REFUND_DIR}/tx{addr_in}.raw']
-    
-    try:
-        raw_res = subprocess.run(raw_args, capture_output=True).stderr.decode()
+def split_refunds(refunds, max_size=MAX_TX_SIZE):
+    groups = []
+    group = []
 
-        if raw_res:
-            print(raw_res)
-            return False
-    except subprocess.CalledProcessError:
-        return False
+    for refund in refunds:
+        candidate = group + [refund]
+        size = estimate_transaction_size([tx_ix for _, tx_ix, _, _ in candidate],
+            [(addr_in, amount) for _, _, addr_in, amount in candidate], 2**32-1, 2**32-1)
 
-    fee_args = ['cardano-cli', 'transaction', 'calculate-min-fee', '--tx-body-file', 
-        f'{REFUND_DIR}/tx{addr_in}.raw', '--tx-in-count', '1', '--tx-out-count', '1',
-        '--witness-count', '1', '--byron-witness-count', '0', f'--{chain}']
-    
-    if chain == 'testnet-magic':
-        fee_args.append(MAGIC)
-    
-    fee_args.append('--protocol-params-file')
-    fee_args.append('protocol.json')
-    
-    try:
-        fee_res = subprocess.run(fee_args, capture_output=True)
+        if group and size > max_size:
+            groups.append(group)
+            candidate = [refund]
 
-        if fee_res.stderr.decode():
-            print(fee_res.stderr.decode())
-            return False
-        
-        fee = fee_res.stdout.decode().split()[0]
-        return fee
-        
-    except subprocess.CalledProcessError:
-        return False
+        group = candidate
+
+    if group:
+        groups.append(group)
+
+    return groups
 
 """
-Builds the refund transaction.
+Builds a single transaction refunding several late mint requests.
+
+The fee is split evenly between the refunds, the first refunds pay the remainder.
 
 Args:
-    tx_hash: The input transaction hash.
-    tx_ix: The input tx_ix.
-    addr_in: The address which requested the mint.
-    output: The amount of ADA (in Lovelace) being refunded to the minter.
-    fee: The transaction fee in Lovelace.
+    refunds: A list of (tx_hash, tx_ix, addr_in, amount) tuples that fits in one transaction.
     chain: The Cardano chain.
 
 Returns:
-    A boolean indicating whether the transaction was successful.
+    The encoded transaction body or False if the transaction could not be built.
 """
-def build_refund_transaction(tx_hash, tx_ix, addr_in, output, fee, chain='testnet-magic'):
-    slot_number = get_slot_number(chain)
+@timed(STAGE_SECONDS, stage='build')
+def build_batch_refund_transaction(refunds, chain='testnet-magic'):
+    slot_number = get_slot_number(chain, TIP_MAX_AGE)
 
     if not slot_number:
         print('Error getting slot number...')
         return False
 
-    args = ['cardano-cli', 'transaction', 'build-raw', '--tx-in', f'{tx_hash}#{tx_ix}', 
-        '--tx-out', f'{addr_in}+{output}', '--ttl', f'{slot_number+SLOT_MARGIN}', 
-        '--fee', fee, '--out-file', f'{REFUND_DIR}/tx{addr_in}.raw']
-    
-    try:
-        res = subprocess.run(args, capture_output=True).stderr.decode()
+    inputs = [(tx_hash, tx_ix) for tx_hash, tx_ix, _, _ in refunds]
+    fee = calculate_transaction_fee([tx_ix for _, tx_ix in inputs],
+        [(addr_in, amount) for _, _, addr_in, amount in refunds], slot_number+SLOT_MARGIN)
 
-        if res:
-            print(res)
-            return False
-        
-        return True
-    except subprocess.CalledProcessError:
+    if not fee:
+        print('Error loading protocol parameters...')
+        return False
+
+    share, remainder = divmod(fee, len(refunds))
+    outputs = [(addr_in, amount - share - (1 if x < remainder else 0))
+        for x, (_, _, addr_in, amount) in enumerate(refunds)]
+
+    try:
+        return build_transaction_body(inputs, outputs, fee, slot_number+SLOT_MARGIN)
+    except ValueError as e:
+        print(e)
         return False
 
 """
 Signs the refund transaction.
 
 Args:
-    tx_ix: The input tx_ix.
-    addr_in: The address which requested to mint.
+    body: The encoded transaction body.
     chain: The Cardano chain.
 
 Returns:
-    A boolean indicating whether the transaction was successful.
+    The encoded signed transaction or False if the signing key could not be loaded.
 """
-def sign_refund_transaction(tx_ix, addr_in, chain='testnet-magic'):
-    args = ['cardano-cli', 'transaction', 'sign', '--tx-body-file', 
-        f'{REFUND_DIR}/tx{addr_in}.raw', '--signing-key-file', 'payment.skey',
-        f'--{chain}']
-
-    if chain == 'testnet-magic':
-        args.append(MAGIC)
-    
-    args.append('--out-file')
-    args.append(f'{REFUND_DIR}/tx{addr_in}.signed')
-    
+@timed(STAGE_SECONDS, stage='sign')
+def sign_refund_transaction(body, chain='testnet-magic'):
     try:
-        res = subprocess.run(args, capture_output=True).stderr.decode()
-
-        if res:
-            print(res)
-            return False
-
-        return True
-    except subprocess.CalledProcessError:
-        return False
\ No newline at end of file
+        return sign_transaction_body(body, ['payment.skey'])
+    except (OSError, ValueError, KeyError) as e:
+        print(e)
+        return False
@@ -0,0 +1,146 @@
+import struct
+
+"""
+Already encoded CBOR that is written to the output unchanged.
+"""
+class Raw(bytes):
+    pass
+
+"""
+Encodes the head of a CBOR item.
+
+Args:
+    major: The major type.
+    value: The argument of the head.
+
+Returns:
+    The encoded head.
+"""
+def encode_head(major, value):
+    if value < 24:
+        return bytes([major << 5 | value])
+    elif value < 2**8:
+        return bytes([major << 5 | 24, value])
+    elif value < 2**16:
+        return bytes([major << 5 | 25]) + struct.pack('>H', value)
+    elif value < 2**32:
+        return bytes([major << 5 | 26]) + struct.pack('>I', value)
+
+    return bytes([major << 5 | 27]) + struct.pack('>Q', value)
+
+"""
+Encodes a value to CBOR with definite lengths, as cardano-cli does.
+
+Maps keep their insertion order.
+
+Args:
+    value: An int, bytes, str, list, tuple, dict, bool, None or Raw value.
+
+Returns:
+    The encoded bytes.
+
+Raises:
+    TypeError: Raised when the value cannot be encoded.
+"""
+def dumps(value):
+    if isinstance(value, Raw):
+        return bytes(value)
+    elif value is True:
+        return b'\xf5'
+    elif value is False:
+        return b'\xf4'
+    elif value is None:
+        return b'\xf6'
+    elif isinstance(value, int):
+        return encode_head(0, value) if value >= 0 else encode_head(1, -1 - value)
+    elif isinstance(value, (bytes, bytearray)):
+        return encode_head(2, len(value)) + bytes(value)
+    elif isinstance(value, str):
+        encoded = value.encode('utf-8')
+        return encode_head(3, len(encoded)) + encoded
+    elif isinstance(value, (list, tuple)):
+        return encode_head(4, len(value)) + b''.join(dumps(item) for item in value)
+    elif isinstance(value, dict):
+        return encode_head(5, len(value)) + b''.join(dumps(key) + dumps(item) for key, item in value.items())
+
+    raise TypeError(f'Cannot encode {type(value).__name__} to CBOR')
+
+"""
+Decodes the CBOR item starting at an offset.
+
+Args:
+    data: The encoded bytes.
+    offset: The offset of the item.
+
+Returns:
+    The decoded value and the offset after the item.
+
+Raises:
+    ValueError: Raised when the data is not valid CBOR.
+"""
+def decode_item(data, offset=0):
+    try:
+        initial = data[offset]
+    except IndexError:
+        raise ValueError('Unexpected end of CBOR data')
+
+    major = initial >> 5
+    info = initial & 0x1f
+    offset += 1
+
+    if info < 24:
+        value = info
+    elif info in (24, 25, 26, 27):
+        size = 1 << (info - 24)
+        value = int.from_bytes(data[offset:offset+size], 'big')
+        offset += size
+    else:
+        raise ValueError(f'Unsupported CBOR additional info {info}')
+
+    if major == 0:
+        return value, offset
+    elif major == 1:
+        return -1 - value, offset
+    elif major == 2:
+        return bytes(data[offset:offset+value]), offset + value
+    elif major == 3:
+        return bytes(data[offset:offset+value]).decode('utf-8'), offset + value
+    elif major == 4:
+        items = []
+
+        for _ in range(value):
+            item, offset = decode_item(data, offset)
+            items.append(item)
+
+        return items, offset
+    elif major == 5:
+        items = dict()
+
+        for _ in range(value):
+            key, offset = decode_item(data, offset)
+            item, offset = decode_item(data, offset)
+            items[tuple(key) if isinstance(key, list) else key] = item
+
+        return items, offset
+    elif major == 6:
+        return decode_item(data, offset)
+    elif major == 7 and info in (20, 21, 22):
+        return {20: False, 21: True, 22: None}[info], offset
+
+    raise ValueError(f'Unsupported CBOR major type {major}')
+
+"""
+Decodes a CBOR value.
+
+Args:
+    data: The encoded bytes.
+
+Returns:
+    The decoded value, tags are dropped.
+
+Raises:
+    ValueError: Raised when the data is not valid CBOR.
+"""
+def loads(data):
+    value, _ = decode_item(data)
+    return value
@@ -0,0 +1,191 @@
+from generate_metadata import get_metadata_index, save_metadata_index
+from fees import MAX_ADDRESS_SIZE, address_size, calculate_fee, estimate_mint_transaction_size
+from policy import get_policy_id, get_policy_script_size
+from helpers import get_address
+from cbor import dumps
+import sys
+
+# Longest string the ledger accepts in transaction metadata
+MAX_STRING_SIZE = 64
+
+"""
+Splits a string longer than MAX_STRING_SIZE bytes into a list of strings, as CIP-25
+allows for any string field.
+
+Chunks are cut on character boundaries so no UTF-8 sequence is split.
+
+Args:
+    value: The string.
+
+Returns:
+    The string or the list of its chunks.
+"""
+def chunk_string(value):
+    if len(value.encode('utf-8')) <= MAX_STRING_SIZE:
+        return value
+
+    chunks = ['']
+
+    for char in value:
+        if len((chunks[-1] + char).encode('utf-8')) > MAX_STRING_SIZE:
+            chunks.append('')
+
+        chunks[-1] += char
+
+    return chunks
+
+"""
+Compacts a metadata value, chunking every long string.
+
+Args:
+    value: The metadata value in JSON format.
+
+Returns:
+    The compacted value.
+
+Raises:
+    ValueError: Raised when a map key is longer than MAX_STRING_SIZE bytes.
+"""
+def compact_value(value):
+    if isinstance(value, str):
+        return chunk_string(value)
+    elif isinstance(value, list):
+        return [compact_value(item) for item in value]
+    elif isinstance(value, dict):
+        for key in value:
+            if isinstance(key, str) and len(key.encode('utf-8')) > MAX_STRING_SIZE:
+                raise ValueError(f'Metadata key longer than {MAX_STRING_SIZE} bytes: {key}')
+
+        return {key: compact_value(item) for key, item in value.items()}
+
+    return value
+
+"""
+Compacts the metadata of a transaction so the ledger accepts it.
+
+Long strings are chunked and the given fields are dropped from every NFT, for fields
+that repeat what the token name or the policy already tell.
+
+Args:
+    metadata: The transaction metadata in JSON format.
+    drop: The names of the NFT fields to drop.
+
+Returns:
+    The compacted metadata.
+
+Raises:
+    ValueError: Raised when a map key is longer than MAX_STRING_SIZE bytes.
+"""
+def compact_metadata(metadata, drop=()):
+    if drop and '721' in metadata:
+        metadata = dict(metadata)
+        metadata['721'] = {policy_id: {name: {field: value for field, value in nft.items() if field not in drop}
+            if isinstance(nft, dict) else nft for name, nft in assets.items()}
+            if isinstance(assets, dict) else assets for policy_id, assets in metadata['721'].items()}
+
+    return compact_value(metadata)
+
+"""
+Encodes transaction metadata like cardano-cli does for JSON without a schema.
+
+Args:
+    metadata: The transaction metadata in JSON format.
+
+Returns:
+    The encoded metadata.
+
+Raises:
+    ValueError: Raised when the metadata cannot be encoded.
+"""
+def encode_metadata(metadata):
+    try:
+        return dumps({int(label): value for label, value in metadata.items()})
+    except TypeError as e:
+        raise ValueError(f'Invalid metadata: {e}')
+
+"""
+Gets the encoded size of transaction metadata.
+
+Args:
+    metadata: The transaction metadata in JSON format.
+
+Returns:
+    The size in bytes.
+
+Raises:
+    ValueError: Raised when the metadata cannot be encoded.
+"""
+def get_metadata_size(metadata):
+    return len(encode_metadata(metadata))
+
+"""
+Predicts the size and fee of a mint transaction before it is built.
+
+The largest input index, Lovelace values, TTL and payer address are assumed, so the
+prediction is an upper bound.
+
+Args:
+    metadata: The compacted transaction metadata in JSON format.
+    token_outputs: The token names in hex sent to each payer.
+    addr_out: The address to send the change to.
+    script_size: The size of the encoded minting script in bytes.
+
+Returns:
+    A (size, fee) tuple, the fee is False if the protocol parameters were not found.
+
+Raises:
+    ValueError: Raised when the metadata cannot be encoded.
+"""
+def predict_mint_transaction(metadata, token_outputs, addr_out, script_size):
+    outputs = [(addr_out, 2**64-1, token_names) for token_names in token_outputs] + [(addr_out, 2**64-1, [])]
+    size = estimate_mint_transaction_size([2**16-1] * len(token_outputs), outputs, 2**32-1, 2**32-1,
+        get_metadata_size(metadata), script_size)
+    size += (MAX_ADDRESS_SIZE - address_size(addr_out)) * len(token_outputs)
+
+    return size, calculate_fee(size)
+
+"""
+Compacts the metadata index and reports its encoded size.
+
+Args:
+    drop: The names of the NFT fields to drop.
+
+Returns:
+    A boolean indicating whether the index was compacted.
+"""
+def compact_metadata_index(drop=()):
+    index = get_metadata_index()
+    policy_id = get_policy_id()
+    script_size = get_policy_script_size()
+    address = get_address()
+
+    if not index or not policy_id or script_size is None or not address:
+        print('Error loading the metadata index, the policy or the address...')
+        return False
+
+    try:
+        compacted = {id: compact_metadata(metadata, drop) for id, metadata in index.items()}
+        before = sum(get_metadata_size(metadata) for metadata in index.values())
+        after = sum(get_metadata_size(metadata) for metadata in compacted.values())
+    except ValueError as e:
+        print(e)
+        return False
+
+    save_metadata_index(compacted, policy_id)
+    print(f'Compacted the metadata of {len(index)} NFTs from {before} to {after} bytes of CBOR.')
+
+    largest = max(compacted.values(), key=get_metadata_size)
+    token_names = [name.encode('utf-8').hex() for name in largest['721'][policy_id]]
+    size, fee = predict_mint_transaction(largest, [token_names], address, script_size)
+    print(f'The largest single mint is at most {size} bytes for a fee of {fee} Lovelace.')
+    return True
+
+if __name__ == '__main__':
+    drop = ()
+
+    for x in range(0,len(sys.argv)):
+        if sys.argv[x] == '--drop-fields':
+            drop = tuple(field.strip() for field in sys.argv[x+1].split(',') if field.strip())
+
+    if not compact_metadata_index(drop):
+        sys.exit(1)
@@ -0,0 +1,174 @@
+from helpers import MAGIC, get_slot_number, run_cardano_cli
+from transaction import decode_transaction_body
+from metrics import CONFIRMATIONS, QUEUE_DEPTH
+from ledger import CONFIRMED
+from utxo import parse_utxos
+import threading
+import hashlib
+
+CONFIRM_INTERVAL = 20
+# Inputs per query utxo call, keeps the command line well below the argument limit
+QUERY_BATCH = 100
+# Slots past the TTL before a transaction counts as expired, covers a lagging tip estimate
+EXPIRY_MARGIN = 60
+EXPIRED = 'expired'
+
+"""
+Queries which of the given UTxOs are unspent.
+
+Args:
+    tx_ins: The UTxOs in tx_hash#tx_ix format.
+    chain: The Cardano chain.
+
+Returns:
+    The set of unspent UTxOs or None if a query failed.
+"""
+def query_unspent(tx_ins, chain='testnet-magic'):
+    unspent = set()
+
+    for start in range(0, len(tx_ins), QUERY_BATCH):
+        args = ['cardano-cli', 'query', 'utxo']
+
+        for tx_in in tx_ins[start:start+QUERY_BATCH]:
+            args.append('--tx-in')
+            args.append(tx_in)
+
+        args.append(f'--{chain}')
+
+        if chain == 'testnet-magic':
+            args.append(MAGIC)
+
+        args.append('--out-file')
+        args.append('/dev/stdout')
+
+        try:
+            unspent |= parse_utxos(run_cardano_cli(args).stdout.decode()).keys()
+        except ValueError:
+            return None
+
+    return unspent
+
+"""
+Tracks submitted transactions in a background thread until they reach a block or expire.
+
+A transaction is confirmed once its inputs are spent and expired once the tip is past
+its TTL while its inputs are still unspent, then it can never be included and the
+requests it spent have to be built again. Outcomes are queued for the thread that
+owns the ledger and index, so tracking never blocks the mint loop. Only the inputs and
+TTL of each transaction are kept, a few hundred bytes per transaction in flight.
+"""
+class ConfirmationTracker:
+    def __init__(self, chain='testnet-magic', interval=CONFIRM_INTERVAL):
+        self.chain = chain
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.transactions = dict()
+        self.outcomes = []
+        self.stopped = threading.Event()
+        self.thread = None
+
+    """
+    Tracks a submitted transaction.
+
+    Args:
+        tx: The encoded signed transaction.
+        kind: The kind of request, mint or refund.
+
+    Returns:
+        The transaction ID or None if the transaction could not be decoded.
+    """
+    def track(self, tx, kind):
+        try:
+            body, fields = decode_transaction_body(tx)
+        except ValueError:
+            print('Error decoding a submitted transaction...')
+            return None
+
+        tx_id = hashlib.blake2b(body, digest_size=32).hexdigest()
+        inputs = tuple(f'{tx_hash.hex()}#{tx_ix}' for tx_hash, tx_ix in fields[0])
+
+        with self.lock:
+            self.transactions[tx_id] = (inputs, fields.get(3), kind)
+
+        return tx_id
+
+    """
+    Checks every tracked transaction once.
+
+    Returns:
+        A boolean indicating whether the chain could be queried.
+    """
+    def check(self):
+        with self.lock:
+            transactions = list(self.transactions.items())
+
+        if not transactions:
+            return True
+
+        unspent = query_unspent([tx_in for _, (inputs, _, _) in transactions for tx_in in inputs], self.chain)
+        slot_number = get_slot_number(self.chain)
+
+        if unspent is None or not slot_number:
+            print('Error when checking confirmations...')
+            return False
+
+        outcomes = []
+
+        for tx_id, (inputs, ttl, kind) in transactions:
+            if not any(tx_in in unspent for tx_in in inputs):
+                outcomes.append((CONFIRMED, inputs, kind))
+            elif ttl is not None and slot_number > ttl + EXPIRY_MARGIN:
+                outcomes.append((EXPIRED, inputs, kind))
+            else:
+                continue
+
+            CONFIRMATIONS.inc(state=outcomes[-1][0])
+
+            with self.lock:
+                self.transactions.pop(tx_id, None)
+
+        with self.lock:
+            self.outcomes += outcomes
+            QUEUE_DEPTH.set(len(self.transactions), queue='unconfirmed')
+
+        return True
+
+    """
+    Takes the outcomes found since the last call.
+
+    Returns:
+        A list of (state, inputs, kind) tuples, state is confirmed or expired.
+    """
+    def take_outcomes(self):
+        with self.lock:
+            outcomes = self.outcomes
+            self.outcomes = []
+
+        return outcomes
+
+    """
+    Gets the number of tracked transactions.
+    """
+    def __len__(self):
+        with self.lock:
+            return len(self.transactions)
+
+    """
+    Starts checking in a background thread.
+    """
+    def start(self):
+        def run():
+            while not self.stopped.wait(self.interval):
+                self.check()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+
+    """
+    Stops the background thread.
+    """
+    def stop(self):
+        self.stopped.set()
+
+        if self.thread:
+            self.thread.join()
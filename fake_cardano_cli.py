@@ -0,0 +1,291 @@
+from cbor import dumps, loads
+from mempool import encode_address
+import hashlib
+import random
+import fcntl
+import json
+import time
+import sys
+import os
+
+# Directory of the fake chain state and call log, set by the benchmark
+STATE_DIR = os.getenv('FAKE_CLI_DIR', './fake_chain')
+UTXOS_FILE = 'utxos.json'
+LOCK_FILE = 'utxos.lock'
+CALLS_FILE = 'calls.log'
+# Wall clock time of slot 0, one slot per second
+SYSTEM_START = 1506203091
+FEE = 190000
+TX_TYPE = 'Tx AlonzoEra'
+TX_BODY_TYPE = 'TxBodyAlonzo'
+
+"""
+Stand-in for cardano-cli used by the offline benchmark.
+
+It imitates query utxo, query tip, transaction build, build-raw, sign and submit
+against a UTxO set kept in a JSON file. Submitted transactions spend their inputs, so
+the watcher sees them disappear like on a real node. Every call is appended to a log
+with its time and the inputs it spent, from which the benchmark derives its numbers.
+"""
+
+"""
+Gets the value of a command line option.
+
+Args:
+    args: The command line arguments.
+    name: The option name.
+
+Returns:
+    The values of every occurrence of the option.
+"""
+def get_options(args, name):
+    return [args[x+1] for x in range(len(args)-1) if args[x] == name]
+
+"""
+Sleeps for the configured latency of a command.
+
+FAKE_CLI_LATENCY sets the latency of every command in seconds and, for example,
+FAKE_CLI_LATENCY_SUBMIT overrides it for transaction submit.
+
+Args:
+    command: The last word of the command, such as utxo or submit.
+"""
+def simulate_latency(command):
+    latency = os.getenv(f'FAKE_CLI_LATENCY_{command.upper().replace("-", "_")}',
+        os.getenv('FAKE_CLI_LATENCY', '0'))
+
+    if float(latency) > 0:
+        time.sleep(float(latency))
+
+"""
+Appends a call to the call log.
+
+Args:
+    command: The command, such as transaction submit.
+    spent: The UTxOs spent by the call.
+"""
+def log_call(command, spent=()):
+    line = json.dumps({'time': time.time(), 'command': command, 'spent': list(spent)}) + '\n'
+
+    # Small appends to a file opened with O_APPEND do not interleave between processes
+    with open(f'{STATE_DIR}/{CALLS_FILE}', 'a') as file:
+        file.write(line)
+
+"""
+Reads and optionally changes the UTxO set while holding the state lock.
+
+Args:
+    change: Called with the UTxO set, returns whether the set was changed.
+    state_dir: The directory of the fake chain state.
+
+Returns:
+    The return value of change.
+"""
+def with_utxos(change, state_dir=STATE_DIR):
+    path = f'{state_dir}/{UTXOS_FILE}'
+
+    with open(f'{state_dir}/{LOCK_FILE}', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        try:
+            with open(path, 'r') as file:
+                utxos = json.load(file)
+        except FileNotFoundError:
+            utxos = dict()
+
+        result = change(utxos)
+
+        if result:
+            with open(f'{path}.tmp', 'w') as file:
+                json.dump(utxos, file)
+
+            os.replace(f'{path}.tmp', path)
+
+        return result
+
+"""
+Writes a text envelope like cardano-cli does.
+
+Args:
+    path: The filepath.
+    type: The envelope type.
+    data: The encoded CBOR.
+"""
+def write_envelope(path, type, data):
+    with open(path, 'w') as file:
+        json.dump({'type': type, 'description': '', 'cborHex': data.hex()}, file)
+
+"""
+Reads a text envelope, from stdin when the path is /dev/stdin.
+
+Args:
+    path: The filepath.
+
+Returns:
+    The encoded CBOR.
+"""
+def read_envelope(path):
+    if path == '/dev/stdin':
+        return bytes.fromhex(json.load(sys.stdin)['cborHex'])
+
+    with open(path, 'r') as file:
+        return bytes.fromhex(json.load(file)['cborHex'])
+
+"""
+Imitates query utxo, selecting UTxOs by --address or --tx-in.
+"""
+def query_utxo(args):
+    addresses = get_options(args, '--address')
+    tx_ins = get_options(args, '--tx-in')
+    utxos = dict()
+
+    def select(state):
+        utxos.update((key, utxo) for key, utxo in state.items()
+            if utxo['address'] in addresses or key in tx_ins)
+        return False
+
+    with_utxos(select)
+    output = json.dumps(utxos)
+
+    for path in get_options(args, '--out-file'):
+        if path != '/dev/stdout':
+            with open(path, 'w') as file:
+                file.write(output)
+            return 0
+
+    print(output)
+    return 0
+
+"""
+Imitates query tip with a slot that advances with the wall clock.
+"""
+def query_tip(args):
+    print(json.dumps({'era': 'Alonzo', 'slot': int(time.time()) - SYSTEM_START}))
+    return 0
+
+"""
+Imitates transaction build and build-raw, the body only keeps the inputs, fee and TTL.
+"""
+def transaction_build(args, raw=False):
+    tx_ins = get_options(args, '--tx-in')
+    out_files = get_options(args, '--out-file')
+
+    if not tx_ins or not out_files:
+        print('Missing --tx-in or --out-file', file=sys.stderr)
+        return 1
+
+    inputs = []
+
+    for tx_in in sorted(tx_ins):
+        tx_hash, tx_ix = tx_in.split('#')
+        inputs.append([bytes.fromhex(tx_hash), int(tx_ix)])
+
+    fee = int((get_options(args, '--fee') or [FEE])[0])
+    ttl = int((get_options(args, '--invalid-hereafter') or [0])[0])
+    body = dumps({0: inputs, 1: [], 2: fee, 3: ttl})
+    write_envelope(out_files[0], TX_BODY_TYPE, body)
+
+    if not raw:
+        print(f'Estimated transaction fee: Lovelace {fee}')
+
+    return 0
+
+"""
+Imitates transaction sign, the witness set is left empty.
+"""
+def transaction_sign(args):
+    body_files = get_options(args, '--tx-body-file')
+    out_files = get_options(args, '--out-file')
+
+    if not body_files or not out_files:
+        print('Missing --tx-body-file or --out-file', file=sys.stderr)
+        return 1
+
+    body = read_envelope(body_files[0])
+    tx = dumps([loads(body), dict(), True, None])
+    write_envelope(out_files[0], TX_TYPE, tx)
+    return 0
+
+"""
+Imitates transaction txid for a body or a signed transaction.
+"""
+def transaction_txid(args):
+    body_files = get_options(args, '--tx-body-file') + get_options(args, '--tx-file')
+    tx = read_envelope(body_files[0])
+    body = tx if isinstance(loads(tx), dict) else dumps(loads(tx)[0])
+    print(hashlib.blake2b(body, digest_size=32).hexdigest())
+    return 0
+
+"""
+Imitates transaction submit, spending the inputs and adding the outputs or failing if an
+input is already spent. FAKE_CLI_DROP_RATE sets the share of transactions that are
+accepted but silently dropped.
+"""
+def transaction_submit(args):
+    tx = loads(read_envelope(get_options(args, '--tx-file')[0]))
+    body = dumps(tx[0])
+    tx_id = hashlib.blake2b(body, digest_size=32).hexdigest()
+    spent = [f'{tx_hash.hex()}#{tx_ix}' for tx_hash, tx_ix in tx[0][0]]
+
+    def spend(utxos):
+        if any(key not in utxos for key in spent):
+            return False
+
+        for key in spent:
+            del utxos[key]
+
+        for tx_ix, (address, value) in enumerate(tx[0][1]):
+            lovelace = value if isinstance(value, int) else value[0]
+            utxos[f'{tx_id}#{tx_ix}'] = {'address': encode_address(address), 'value': {'lovelace': lovelace}}
+
+        return True
+
+    # A dropped transaction is accepted but never reaches a block, like one evicted from the mempool
+    if random.random() < float(os.getenv('FAKE_CLI_DROP_RATE', '0')):
+        log_call('transaction submit')
+        print('Transaction successfully submitted.')
+        return 0
+
+    if not with_utxos(spend):
+        print('Command failed: transaction submit  Error: BadInputsUTxO', file=sys.stderr)
+        return 1
+
+    log_call('transaction submit', spent)
+    print('Transaction successfully submitted.')
+    return 0
+
+COMMANDS = {
+    ('query', 'utxo'): query_utxo,
+    ('query', 'tip'): query_tip,
+    ('transaction', 'build'): transaction_build,
+    ('transaction', 'build-raw'): lambda args: transaction_build(args, raw=True),
+    ('transaction', 'sign'): transaction_sign,
+    ('transaction', 'txid'): transaction_txid,
+    ('transaction', 'submit'): transaction_submit
+}
+
+"""
+Runs a command.
+
+Args:
+    args: The command line arguments without the program name.
+
+Returns:
+    The exit status.
+"""
+def main(args):
+    command = tuple(args[:2])
+
+    if command not in COMMANDS:
+        print(f'Unsupported command: {" ".join(args[:2])}', file=sys.stderr)
+        return 1
+
+    simulate_latency(command[1])
+
+    if command != ('transaction', 'submit'):
+        log_call(' '.join(command))
+
+    return COMMANDS[command](args[2:])
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
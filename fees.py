@@ -0,0 +1,224 @@
+import json
+import math
+import threading
+
+PROTOCOL_DIR = './protocol.json'
+
+# Alonzo min-UTxO constants (in words of 8 bytes)
+UTXO_ENTRY_SIZE_WITHOUT_VAL = 27
+COIN_SIZE = 2
+POLICY_ID_SIZE = 28
+
+# Serialized sizes of the fixed transaction parts
+TX_IN_SIZE = 1 + 2 + 32
+VKEY_WITNESS_SIZE = 1 + 2 + 32 + 2 + 64
+# Key and bytes of the auxiliary data hash
+AUXILIARY_DATA_HASH_SIZE = 1 + 2 + 32
+# Array and empty script list around the metadata in the Alonzo auxiliary data
+AUXILIARY_DATA_OVERHEAD = 2
+BECH32_CHECKSUM_LENGTH = 6
+# Longest address a payer can have, a base address with a key hash stake part
+MAX_ADDRESS_SIZE = 57
+
+protocol_parameters = None
+protocol_lock = threading.Lock()
+
+"""
+Gets the protocol parameters, loading protocol.json only on the first call.
+
+Returns:
+    The protocol parameters or False if protocol.json was not found.
+"""
+def get_protocol_parameters():
+    global protocol_parameters
+
+    with protocol_lock:
+        if protocol_parameters is None:
+            try:
+                with open(PROTOCOL_DIR, 'r') as file:
+                    protocol_parameters = json.load(file)
+            except FileNotFoundError:
+                return False
+
+    return protocol_parameters
+
+"""
+Calculates the linear fee of a transaction.
+
+Args:
+    tx_size: The size of the signed transaction in bytes.
+
+Returns:
+    The minimum fee in Lovelace or False if the protocol parameters were not found.
+"""
+def calculate_fee(tx_size):
+    params = get_protocol_parameters()
+
+    if not params:
+        return False
+
+    min_fee_a = params.get('txFeePerByte', params.get('minFeeA'))
+    min_fee_b = params.get('txFeeFixed', params.get('minFeeB'))
+    return min_fee_a * tx_size + min_fee_b
+
+"""
+Calculates the Alonzo minimum UTxO value of an output.
+
+Args:
+    assets: The multi-asset bundle of the output as {policy_id: {asset_name_hex: quantity}}.
+
+Returns:
+    The minimum Lovelace of the output or False if the protocol parameters were not found.
+"""
+def calculate_min_utxo(assets=None):
+    params = get_protocol_parameters()
+
+    if not params:
+        return False
+
+    if params.get('utxoCostPerWord') is not None:
+        coins_per_word = params['utxoCostPerWord']
+    elif params.get('utxoCostPerByte') is not None:
+        coins_per_word = params['utxoCostPerByte'] * 8
+    else:
+        return params['minUTxOValue']
+
+    if assets:
+        num_assets = sum(len(tokens) for tokens in assets.values())
+        name_length = sum(len(name) // 2 for tokens in assets.values() for name in tokens)
+        value_size = 6 + math.ceil((num_assets * 12 + name_length + len(assets) * POLICY_ID_SIZE) / 8)
+    else:
+        value_size = COIN_SIZE
+
+    return (UTXO_ENTRY_SIZE_WITHOUT_VAL + value_size) * coins_per_word
+
+"""
+Gets the serialized size of an unsigned integer in CBOR.
+
+Args:
+    value: The integer.
+
+Returns:
+    The size in bytes.
+"""
+def uint_size(value):
+    if value < 24:
+        return 1
+    elif value < 2**8:
+        return 2
+    elif value < 2**16:
+        return 3
+    elif value < 2**32:
+        return 5
+
+    return 9
+
+"""
+Gets the length of the raw bytes behind a bech32 address.
+
+Args:
+    address: The bech32 address.
+
+Returns:
+    The address length in bytes.
+"""
+def address_size(address):
+    data = address[address.rindex('1')+1:]
+    return (len(data) - BECH32_CHECKSUM_LENGTH) * 5 // 8
+
+"""
+Estimates the size of a signed Lovelace-only transaction.
+
+Args:
+    tx_ixs: The tx_ix of every input.
+    outputs: A list of (address, lovelace) tuples.
+    fee: The transaction fee in Lovelace.
+    ttl: The slot after which the transaction is invalid.
+    witness_count: The number of key witnesses.
+
+Returns:
+    The transaction size in bytes.
+"""
+def estimate_transaction_size(tx_ixs, outputs, fee, ttl, witness_count=1):
+    body_size = 1
+    body_size += 1 + uint_size(len(tx_ixs)) + sum(TX_IN_SIZE + uint_size(tx_ix) for tx_ix in tx_ixs)
+    body_size += 1 + uint_size(len(outputs))
+
+    for address, lovelace in outputs:
+        length = address_size(address)
+        body_size += 1 + uint_size(length) + length + uint_size(lovelace)
+
+    body_size += 1 + uint_size(fee) + 1 + uint_size(ttl)
+    witness_size = 1 + 1 + uint_size(witness_count) + witness_count * VKEY_WITNESS_SIZE
+
+    return 1 + body_size + witness_size + 1 + 1
+
+"""
+Calculates the minimum fee of a signed Lovelace-only transaction.
+
+The fee is sized for a 4-byte fee field so the result stays valid once it is
+written into the transaction.
+
+Args:
+    tx_ixs: The tx_ix of every input.
+    outputs: A list of (address, lovelace) tuples.
+    ttl: The slot after which the transaction is invalid.
+    witness_count: The number of key witnesses.
+
+Returns:
+    The minimum fee in Lovelace or False if the protocol parameters were not found.
+"""
+def calculate_transaction_fee(tx_ixs, outputs, ttl, witness_count=1):
+    return calculate_fee(estimate_transaction_size(tx_ixs, outputs, 2**32-1, ttl, witness_count))
+
+"""
+Gets the serialized size of a multi-asset bundle under a single policy.
+
+Args:
+    token_names: The asset names in hex.
+
+Returns:
+    The size in bytes.
+"""
+def multi_asset_size(token_names):
+    size = 1 + 2 + POLICY_ID_SIZE + 1 + uint_size(len(token_names))
+
+    for name in token_names:
+        length = len(name) // 2
+        size += uint_size(length) + length + uint_size(1)
+
+    return size
+
+"""
+Estimates the size of a signed transaction that mints under a single policy.
+
+Outputs holding assets become [coin, assets] values, the minted assets are repeated in
+the mint field and the metadata and minting script are added to the auxiliary data
+and witness set.
+
+Args:
+    tx_ixs: The tx_ix of every input.
+    outputs: A list of (address, lovelace, token_names) tuples, token_names in hex.
+    fee: The transaction fee in Lovelace.
+    ttl: The slot after which the transaction is invalid.
+    metadata_size: The size of the encoded metadata in bytes.
+    script_size: The size of the encoded minting script in bytes.
+    witness_count: The number of key witnesses.
+
+Returns:
+    The transaction size in bytes.
+"""
+def estimate_mint_transaction_size(tx_ixs, outputs, fee, ttl, metadata_size, script_size, witness_count=2):
+    size = estimate_transaction_size(tx_ixs, [(address, lovelace) for address, lovelace, _ in outputs], fee, ttl,
+        witness_count)
+    minted = [name for _, _, token_names in outputs for name in token_names]
+
+    for _, _, token_names in outputs:
+        if token_names:
+            size += 1 + multi_asset_size(token_names)
+
+    # The mint field, the auxiliary data hash, the auxiliary data and the script witnesses
+    size += 1 + multi_asset_size(minted) + AUXILIARY_DATA_HASH_SIZE
+    size += AUXILIARY_DATA_OVERHEAD + metadata_size + 1 + 1 + script_size
+
+    return size
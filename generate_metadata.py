@@ -1,63 +1,267 @@
-from helpers import add_image_to_ipfs, pin_image_to_ipfs, get_policy_id
+from helpers import add_image_to_ipfs, pin_image_to_ipfs
+from policy import get_policy_id
+from image_cache import IMG_DIR, get_image_cache
+from metrics import STAGE_SECONDS, timed
+import threading
+import random
 import json
 import secrets
+import sys
 import os
 
-IMG_DIR = './img'
 METADATA_DIR = './metadata'
-HASHES_DIR = './hashes.json'
+METADATA_INDEX_DIR = f'{METADATA_DIR}/index.json'
+TRAIT_PLAN_DIR = f'{METADATA_DIR}/traits.json'
+# Image rendered from the planned traits of an NFT
+TRAIT_IMAGE_NAME = '{id}.png'
 NAME = 'TokenFund'
 DESCRIPTION = 'Receives monthly dividends from the Token Fund'
 TYPE = 'Angel'
 
+metadata_index = None
+metadata_index_policy_id = None
+metadata_index_lock = threading.Lock()
+
 """
-Generates the metadata for an NFT.
+Gets the IPFS hash of an image, uploading and pinning it if it is not cached.
+
+Args:
+    image: The image name in the image directory.
+
+Returns:
+    The IPFS hash or False if the image could not be pinned.
+"""
+def get_image_hash(image):
+    image_cache = get_image_cache()
+    hash = image_cache.get(image)
+
+    if hash is not None:
+        return hash
+
+    with open(f'{IMG_DIR}/{image}', 'rb') as file:
+        add_response = add_image_to_ipfs(file)
+
+    if 'Hash' not in add_response:
+        return False
+
+    hash = add_response['Hash']
+    pin_response = pin_image_to_ipfs(hash)
+
+    if 'error' in pin_response:
+        return False
+
+    image_cache.put(image, hash)
+    return hash
+
+"""
+Builds the CIP-25 entry of a single NFT.
 
 Args:
     id: The ID of the NFT.
+    hash: The IPFS hash of the image.
+    attributes: The traits of the NFT by layer name.
 
 Returns:
-    The metadata of the NFT in JSON format or False if an error occured.
+    The token name and the metadata of the NFT.
 """
-def generate_metadata(id):
+def build_nft_metadata(id, hash, attributes=None):
+    name = f'{NAME}{str(id).zfill(5)}'
+    nft_metadata = {
+        'description': DESCRIPTION,
+        'name': name,
+        'id': id,
+        'image': f'ipfs://{hash}',
+        'type': TYPE
+    }
+
+    if attributes:
+        nft_metadata['attributes'] = attributes
+
+    return name, nft_metadata
+
+"""
+Loads the trait plan written by traits.py.
+
+Returns:
+    A dict of the planned traits and rarity keyed by NFT ID or None if no traits were planned.
+"""
+def load_trait_plan():
+    try:
+        with open(TRAIT_PLAN_DIR, 'r') as file:
+            return {int(id): entry for id, entry in json.load(file).items()}
+    except FileNotFoundError:
+        return None
+
+"""
+Gets the pre-generated metadata index, loading it on the first call.
+
+The index is refused when it was generated under another policy, such as after
+monitor_mint_transactions.py created a new one, since its token names would not be
+minted by the current policy.
+
+Returns:
+    A dict of the metadata keyed by NFT ID, empty if no metadata was pre-generated,
+    or False if the index belongs to another policy.
+"""
+def get_metadata_index():
+    global metadata_index, metadata_index_policy_id
+
+    policy_id = get_policy_id()
+
+    with metadata_index_lock:
+        if metadata_index is None:
+            try:
+                with open(METADATA_INDEX_DIR, 'r') as file:
+                    index = json.load(file)
+            except FileNotFoundError:
+                index = {'policy_id': None, 'metadata': dict()}
+
+            metadata_index = {int(id): metadata for id, metadata in index['metadata'].items()}
+            metadata_index_policy_id = index['policy_id']
+
+        if metadata_index and metadata_index_policy_id != policy_id:
+            print(f'Error: the metadata index was generated for policy {metadata_index_policy_id}, '
+                f'not {policy_id}, generate the metadata again...')
+            return False
+
+    return metadata_index
+
+"""
+Writes the metadata index and makes it the one served by generate_metadata.
+
+Args:
+    index: A dict of the metadata keyed by NFT ID.
+    policy_id: The policy ID the metadata was generated under.
+"""
+def save_metadata_index(index, policy_id):
+    global metadata_index, metadata_index_policy_id
+
+    with open(f'{METADATA_INDEX_DIR}.tmp', 'w') as file:
+        json.dump({'policy_id': policy_id, 'metadata': index}, file)
+
+    os.replace(f'{METADATA_INDEX_DIR}.tmp', METADATA_INDEX_DIR)
+
+    with metadata_index_lock:
+        metadata_index = index
+        metadata_index_policy_id = policy_id
+
+"""
+Generates the metadata for a range of NFTs in one pass.
+
+Every NFT gets a different image, assigned by a shuffle of the image directory. When
+traits were planned with traits.py, every NFT instead gets the image rendered from its
+traits and the traits as CIP-25 attributes. The metadata is written to a single index
+file that generate_metadata looks NFTs up in.
+
+Args:
+    start_id: The ID of the first NFT.
+    end_id: The ID of the last NFT.
+    seed: The seed of the shuffle, a cryptographic shuffle is used when None.
+
+Returns:
+    The metadata index or False if an error occured.
+"""
+def generate_bulk_metadata(start_id, end_id, seed=None):
     policy_id = get_policy_id()
 
     if not policy_id:
         print('Error getting policy ID...')
         return False
 
-    metadata = {'721': {policy_id: {}}}
-    images = os.listdir(IMG_DIR)
-    image = images[secrets.randbelow(len(images))]
+    plan = load_trait_plan()
 
-    try:
-        with open(HASHES_DIR, 'r') as file:
-            image_hashes = json.load(file)
-    except FileNotFoundError:
-        image_hashes = dict()
+    if plan is not None:
+        if any(id not in plan for id in range(start_id, end_id+1)):
+            print(f'The trait plan does not cover NFTs {start_id} to {end_id}...')
+            return False
 
-    if image not in image_hashes:
-        add_response = add_image_to_ipfs(open(f'{IMG_DIR}/{image}', 'rb'))
-        hash = add_response['Hash']
-        pin_response = pin_image_to_ipfs(hash)
+        images = [TRAIT_IMAGE_NAME.format(id=id) for id in range(start_id, end_id+1)]
+        missing = [image for image in images if not os.path.exists(f'{IMG_DIR}/{image}')]
+
+        if missing:
+            print(f'{len(missing)} images rendered from the traits are missing, such as {missing[0]}...')
+            return False
     else:
-        hash = image_hashes[image]
-
-    if image in image_hashes or 'error' not in pin_response:
-        name = f'{NAME}{str(id).zfill(5)}'
-        metadata['721'][policy_id][name] = {
-            'description': DESCRIPTION,
-            'name': name,
-            'id': id,
-            'image': f'ipfs://{hash}',
-            'type': TYPE
-        }
-        image_hashes[image] = hash
-
-        with open(HASHES_DIR, 'w') as file:
-            json.dump(image_hashes, file)
-    
-    with open(f'{METADATA_DIR}/metadata{id}.json', 'w') as file:
-        json.dump(metadata, file)
-    
-    return metadata
\ No newline at end of file
+        images = sorted(os.listdir(IMG_DIR))
+
+        if len(images) < end_id - start_id + 1:
+            print(f'Not enough images for {end_id - start_id + 1} NFTs...')
+            return False
+
+        rng = secrets.SystemRandom() if seed is None else random.Random(seed)
+        rng.shuffle(images)
+
+    index = dict()
+
+    for id, image in zip(range(start_id, end_id+1), images):
+        hash = get_image_hash(image)
+
+        if not hash:
+            print(f'Error pinning {image}...')
+            return False
+
+        attributes = plan[id]['attributes'] if plan is not None else None
+        name, nft_metadata = build_nft_metadata(id, hash, attributes)
+        index[id] = {'721': {policy_id: {name: nft_metadata}}}
+
+    get_image_cache().flush()
+    save_metadata_index(index, policy_id)
+    return index
+
+"""
+Generates the metadata for an NFT.
+
+Pre-generated metadata is used when the NFT is in the metadata index, otherwise a
+random image is picked.
+
+Args:
+    id: The ID of the NFT.
+
+Returns:
+    The metadata of the NFT in JSON format or False if an error occured.
+"""
+@timed(STAGE_SECONDS, stage='metadata')
+def generate_metadata(id):
+    index = get_metadata_index()
+
+    if index is False:
+        return False
+
+    metadata = index.get(id)
+
+    if metadata is None:
+        policy_id = get_policy_id()
+
+        if not policy_id:
+            print('Error getting policy ID...')
+            return False
+
+        images = os.listdir(IMG_DIR)
+        image = images[secrets.randbelow(len(images))]
+        hash = get_image_hash(image)
+
+        if not hash:
+            print(f'Error pinning {image}...')
+            return False
+
+        name, nft_metadata = build_nft_metadata(id, hash)
+        metadata = {'721': {policy_id: {name: nft_metadata}}}
+
+    return metadata
+
+if __name__ == '__main__':
+    starting_id = 1
+    seed = None
+
+    for x in range(0,len(sys.argv)):
+        if sys.argv[x] == '--starting-id':
+            starting_id = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--total-mint':
+            total_mint = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--seed':
+            seed = int(sys.argv[x+1].strip())
+
+    assert total_mint >= starting_id, f'Invalid argument for total mint: {total_mint}'
+
+    if generate_bulk_metadata(starting_id, total_mint, seed):
+        print(f'Generated metadata for NFTs {starting_id} to {total_mint}.')
@@ -1,14 +1,15 @@
 from dotenv import load_dotenv
-import os
-import requests
+from blockfrost import get_client
+from metrics import CLI_CALLS, CLI_SECONDS
 import subprocess
 import json
+import threading
+import time
 
 load_dotenv()
 
 MAGIC = '1097911063'
 
-API_URL = 'https://ipfs.blockfrost.io/api/v0/'
 ADD_ENDPOINT = 'ipfs/add/'
 PIN_ENDPOINT = 'ipfs/pin/add/'
 TRANSACTION_ENDPOINT = 'txs/{}/utxos'
@@ -16,19 +17,37 @@ TRANSACTION_ENDPOINT = 'txs/{}/utxos'
 ADDRESS_DIR = './payment.addr'
 POLICY_DIR = './policy'
 
+# Seconds between live tip queries and seconds per slot
+TIP_REFRESH_INTERVAL = 30
+SLOT_LENGTH = 1
+
+tips = dict()
+tip_lock = threading.Lock()
+
 """
-Gets the policy ID.
+Runs a cardano-cli command, counting and timing the invocation.
+
+Args:
+    args: The command line arguments, starting with cardano-cli.
+    input: The bytes passed to the standard input.
 
 Returns:
-    The policy ID or False if the policy ID was not found.
+    The completed process with the captured output.
 """
-def get_policy_id():
+def run_cardano_cli(args, input=None):
+    command = ' '.join(args[1:3])
+    start = time.perf_counter()
+
     try:
-        with open(f'{POLICY_DIR}/policyID', 'r') as file:
-            policy_id = file.readline().strip()
-        return policy_id
-    except FileNotFoundError:
-        return False
+        res = subprocess.run(args, input=input, capture_output=True)
+    except OSError:
+        CLI_CALLS.inc(command=command, status='error')
+        raise
+    finally:
+        CLI_SECONDS.observe(time.perf_counter() - start, command=command)
+
+    CLI_CALLS.inc(command=command, status='ok' if res.returncode == 0 else 'error')
+    return res
 
 """
 Adds the given image to IPFS.
@@ -40,11 +59,7 @@ Returns:
     The response of the Blockfrost API.
 """
 def add_image_to_ipfs(img):
-    response = requests.post(
-        API_URL + ADD_ENDPOINT, 
-        headers={'project_id':os.getenv('PROJECT_ID')},
-        files={'file':img}
-    ).json()
+    response = get_client().post(ADD_ENDPOINT, files={'file':img})
     return response
 
 """
@@ -57,10 +72,7 @@ Returns:
     The response of the Blockfrost API.
 """
 def pin_image_to_ipfs(hash):
-    response = requests.post(
-        API_URL + PIN_ENDPOINT + hash, 
-        headers={'project_id':os.getenv('PROJECT_ID')}
-    ).json()
+    response = get_client().post(PIN_ENDPOINT + hash)
     return response
 
 """
@@ -73,10 +85,7 @@ Returns:
     The response of the Blockfrost API.
 """
 def get_mint_address(tx_hash):
-    response = requests.get(
-        API_URL + TRANSACTION_ENDPOINT.format(tx_hash), 
-        headers={'project_id':os.getenv('PROJECT_ID')}
-    ).json()
+    response = get_client().get(TRANSACTION_ENDPOINT.format(tx_hash))
     return response
 
 """
@@ -94,27 +103,56 @@ def get_address():
         return False
 
 """
-Gets the current slot number of the Cardano chain.
+Queries the current slot number from the Cardano node.
 
 Args:
     chain: The Cardano chain.
 
 Returns:
-    The current slot number.
+    The current slot number or False if the query was not successful.
 """
-def get_slot_number(chain='testnet-magic'):
+def query_slot_number(chain='testnet-magic'):
     args = ['cardano-cli', 'query', 'tip', f'--{chain}']
 
     if chain == 'testnet-magic':
         args.append(MAGIC)
 
     try:
-        output = subprocess.run(args, capture_output=True).stdout.decode()
+        output = run_cardano_cli(args).stdout.decode()
     except subprocess.CalledProcessError:
         return False
 
     try:
         slot_number = json.loads(output)['slot']
         return int(slot_number)
-    except KeyError:
-        return False
\ No newline at end of file
+    except (KeyError, ValueError):
+        return False
+
+"""
+Gets the current slot number of the Cardano chain.
+
+The node is only queried when the last queried tip is older than max_age seconds,
+otherwise the slot is estimated from the wall clock and the last queried tip.
+
+Args:
+    chain: The Cardano chain.
+    max_age: The maximum age in seconds of the queried tip an estimate may be based on.
+
+Returns:
+    The current slot number or False if the slot number could not be queried.
+"""
+def get_slot_number(chain='testnet-magic', max_age=TIP_REFRESH_INTERVAL):
+    with tip_lock:
+        if chain in tips:
+            slot_number, queried = tips[chain]
+            age = time.time() - queried
+
+            if age <= max_age:
+                return slot_number + int(age / SLOT_LENGTH)
+
+        slot_number = query_slot_number(chain)
+
+        if slot_number:
+            tips[chain] = (slot_number, time.time())
+
+        return slot_number
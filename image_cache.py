@@ -0,0 +1,184 @@
+import threading
+import hashlib
+import atexit
+import fcntl
+import json
+import os
+
+HASHES_DIR = './hashes.json'
+IMG_DIR = './img'
+FLUSH_EVERY = 10
+
+"""
+Gets the SHA-256 digest of a file.
+
+Args:
+    path: The filepath.
+
+Returns:
+    The hex digest.
+"""
+def file_digest(path):
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+"""
+In-memory cache of the IPFS hashes of the images, persisted to hashes.json.
+
+Entries are keyed by image name and content digest. An entry is checked against the
+size and mtime of the image and the image is only hashed again when those changed,
+so replacing an image's content invalidates its old IPFS hash. New entries are
+flushed in batches with an atomic rename, merging with writers in other processes.
+"""
+class ImageHashCache:
+    def __init__(self, path=HASHES_DIR, img_dir=IMG_DIR, flush_every=FLUSH_EVERY):
+        # Resolved now, the cache is also flushed at exit after the working directory may have changed.
+        # Symlinks are followed, so shards sharing hashes.json replace and lock the same file.
+        self.path = os.path.realpath(path)
+        self.img_dir = os.path.abspath(img_dir)
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self.dirty = 0
+        self.entries = self.read()
+        self.digests = {entry['digest']: entry['hash'] for entry in self.entries.values() if entry.get('digest')}
+
+    """
+    Reads the entries from disk, converting the old {image: hash} format.
+
+    Returns:
+        A dict of the entries keyed by image name.
+    """
+    def read(self):
+        try:
+            with open(self.path, 'r') as file:
+                entries = json.load(file)
+        except FileNotFoundError:
+            return dict()
+
+        return {image: entry if isinstance(entry, dict) else {'hash': entry} for image, entry in entries.items()}
+
+    """
+    Gets the IPFS hash of an image.
+
+    Args:
+        image: The image name in the image directory.
+
+    Returns:
+        The IPFS hash or None if the image has not been uploaded with its current content.
+    """
+    def get(self, image):
+        path = f'{self.img_dir}/{image}'
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        with self.lock:
+            entry = self.entries.get(image)
+
+            if entry and entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime_ns:
+                return entry['hash']
+
+        digest = file_digest(path)
+
+        with self.lock:
+            entry = self.entries.get(image)
+
+            # Entries in the old format have no digest and are trusted once
+            if entry and entry.get('digest', digest) == digest:
+                hash = entry['hash']
+            elif digest in self.digests:
+                hash = self.digests[digest]
+            else:
+                self.entries.pop(image, None)
+                return None
+
+            self.store(image, hash, digest, stat)
+            return hash
+
+    """
+    Adds the IPFS hash of an uploaded image.
+
+    Args:
+        image: The image name in the image directory.
+        hash: The IPFS hash.
+    """
+    def put(self, image, hash):
+        path = f'{self.img_dir}/{image}'
+        stat = os.stat(path)
+        digest = file_digest(path)
+
+        with self.lock:
+            self.store(image, hash, digest, stat)
+
+        if self.dirty >= self.flush_every:
+            self.flush()
+
+    """
+    Stores an entry, the caller holds the lock.
+
+    Args:
+        image: The image name in the image directory.
+        hash: The IPFS hash.
+        digest: The content digest of the image.
+        stat: The stat result of the image.
+    """
+    def store(self, image, hash, digest, stat):
+        self.entries[image] = {'hash': hash, 'digest': digest, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        self.digests[digest] = hash
+        self.dirty += 1
+
+    """
+    Writes the entries to disk if any changed.
+
+    The file is locked while the entries on disk are merged with the ones in memory and
+    the result replaces the file atomically.
+    """
+    def flush(self):
+        with self.lock:
+            if not self.dirty:
+                return
+
+            with open(f'{self.path}.lock', 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+                try:
+                    entries = self.read()
+                    entries.update(self.entries)
+
+                    with open(f'{self.path}.tmp', 'w') as file:
+                        json.dump(entries, file)
+                        file.flush()
+                        os.fsync(file.fileno())
+
+                    os.replace(f'{self.path}.tmp', self.path)
+                    self.entries = entries
+                    self.digests = {entry['digest']: entry['hash'] for entry in entries.values() if entry.get('digest')}
+                    self.dirty = 0
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+image_cache = None
+image_cache_lock = threading.Lock()
+
+"""
+Gets the image hash cache of the process, loading it on the first call.
+
+Returns:
+    The image hash cache.
+"""
+def get_image_cache():
+    global image_cache
+
+    with image_cache_lock:
+        if image_cache is None:
+            image_cache = ImageHashCache()
+            atexit.register(image_cache.flush)
+
+    return image_cache
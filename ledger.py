@@ -0,0 +1,183 @@
+from metrics import REQUESTS
+import sqlite3
+import threading
+import time
+
+LEDGER_DIR = './ledger.db'
+
+DETECTED = 'detected'
+BUILT = 'built'
+SIGNED = 'signed'
+SUBMITTED = 'submitted'
+CONFIRMED = 'confirmed'
+IN_FLIGHT = (SUBMITTED, CONFIRMED)
+
+"""
+Durable record of every mint and refund request, keyed by its input UTxO.
+
+Each request moves through detected, built, signed, submitted and confirmed. The
+records are kept in SQLite and mirrored in memory so lookups never touch the disk.
+Signed transactions are only kept in SQLite, until their request is confirmed.
+"""
+class Ledger:
+    def __init__(self, path=LEDGER_DIR):
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS requests (utxo TEXT PRIMARY KEY, '
+            'kind TEXT NOT NULL, state TEXT NOT NULL, nft_id INTEGER, updated REAL, tx BLOB, quantity INTEGER)')
+        self.connection.commit()
+        self.records = {row[0]: list(row[1:]) for row in
+            self.connection.execute('SELECT utxo, kind, state, nft_id, quantity FROM requests')}
+
+    """
+    Records the state of a request.
+
+    Args:
+        utxo: The input UTxO in tx_hash#tx_ix format.
+        kind: The kind of request, mint or refund.
+        state: The new state of the request.
+        nft_id: The NFT ID assigned to the request.
+        tx: The encoded signed transaction.
+        quantity: The number of NFTs minted from nft_id on, one when None.
+    """
+    def record(self, utxo, kind, state, nft_id=None, tx=None, quantity=None):
+        with self.lock:
+            previous = self.records.get(utxo)
+
+            if previous:
+                nft_id = previous[2] if nft_id is None else nft_id
+                quantity = previous[3] if quantity is None else quantity
+
+            self.records[utxo] = [kind, state, nft_id, quantity]
+            self.connection.execute('INSERT INTO requests VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(utxo) DO UPDATE '
+                'SET kind = excluded.kind, state = excluded.state, nft_id = excluded.nft_id, '
+                'updated = excluded.updated, tx = CASE WHEN excluded.state = ? '
+                'THEN NULL ELSE coalesce(excluded.tx, requests.tx) END, quantity = excluded.quantity',
+                (utxo, kind, state, nft_id, time.time(), tx, quantity, CONFIRMED))
+            self.connection.commit()
+
+        REQUESTS.inc(kind=kind, state=state)
+
+    """
+    Gets the record of a request.
+
+    Args:
+        utxo: The input UTxO in tx_hash#tx_ix format.
+
+    Returns:
+        The [kind, state, nft_id, quantity] record or None if the request is unknown.
+    """
+    def get(self, utxo):
+        return self.records.get(utxo)
+
+    """
+    Checks whether a request has already been submitted.
+
+    Args:
+        utxo: The input UTxO in tx_hash#tx_ix format.
+
+    Returns:
+        A boolean indicating whether the request is submitted or confirmed.
+    """
+    def in_flight(self, utxo):
+        record = self.records.get(utxo)
+        return record is not None and record[1] in IN_FLIGHT
+
+    """
+    Marks a submitted request as confirmed once its input UTxO is spent.
+
+    Args:
+        utxo: The input UTxO in tx_hash#tx_ix format.
+    """
+    def confirm(self, utxo):
+        record = self.records.get(utxo)
+
+        if record and record[1] == SUBMITTED:
+            self.record(utxo, record[0], CONFIRMED)
+
+    """
+    Resets a submitted request whose transaction expired, so it is built again.
+
+    The NFT IDs are kept so the request is minted with the same token names.
+
+    Args:
+        utxo: The input UTxO in tx_hash#tx_ix format.
+    """
+    def expire(self, utxo):
+        with self.lock:
+            record = self.records.get(utxo)
+
+            if not record or record[1] != SUBMITTED:
+                return
+
+            self.records[utxo] = [record[0], DETECTED, record[2], record[3]]
+            self.connection.execute('INSERT OR REPLACE INTO requests VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (utxo, record[0], DETECTED, record[2], time.time(), None, record[3]))
+            self.connection.commit()
+
+        REQUESTS.inc(kind=record[0], state='expired')
+
+    """
+    Gets the next free NFT ID.
+
+    Args:
+        default: The ID to start from when no NFT has been recorded.
+
+    Returns:
+        The NFT ID after the highest recorded one.
+    """
+    def next_id(self, default=1):
+        ids = [record[2] + (record[3] or 1) - 1 for record in self.records.values()
+            if record[0] == 'mint' and record[2] is not None]
+        return max(ids + [default - 1]) + 1
+
+    """
+    Gets the requests that were signed but not recorded as submitted.
+
+    Args:
+        kind: The kind of request, mint or refund.
+
+    Returns:
+        A list of (utxo, nft_id, tx) tuples.
+    """
+    def signed(self, kind):
+        return [(utxo, record[2], self.get_tx(utxo)) for utxo, record in self.records.items()
+            if record[0] == kind and record[1] == SIGNED]
+
+    """
+    Gets the requests that were submitted but not confirmed yet.
+
+    Returns:
+        A list of (utxo, kind, tx) tuples.
+    """
+    def submitted(self):
+        return [(utxo, record[0], self.get_tx(utxo)) for utxo, record in self.records.items()
+            if record[1] == SUBMITTED]
+
+    """
+    Gets the signed transaction of a request.
+
+    Args:
+        utxo: The input UTxO in tx_hash#tx_ix format.
+
+    Returns:
+        The encoded signed transaction or None if it is not stored.
+    """
+    def get_tx(self, utxo):
+        with self.lock:
+            row = self.connection.execute('SELECT tx FROM requests WHERE utxo = ?', (utxo,)).fetchone()
+
+        return row[0] if row else None
+
+    """
+    Forgets the requests that were never signed, their transactions cannot be on chain.
+    """
+    def forget_unsigned(self):
+        with self.lock:
+            unsigned = [utxo for utxo, record in self.records.items() if record[1] in (DETECTED, BUILT)]
+
+            for utxo in unsigned:
+                del self.records[utxo]
+
+            self.connection.executemany('DELETE FROM requests WHERE utxo = ?', [(utxo,) for utxo in unsigned])
+            self.connection.commit()
@@ -0,0 +1,228 @@
+from utxo import UTxO
+from cbor import loads
+from collections import OrderedDict
+import threading
+import hashlib
+import bech32
+
+MAX_CHAIN_DEPTH = 5
+ADDRESS_PREFIXES = {0: 'addr_test', 1: 'addr'}
+
+"""
+Encodes the raw bytes of a Shelley address in bech32.
+
+Args:
+    address: The address bytes from a transaction output.
+
+Returns:
+    The bech32 address.
+"""
+def encode_address(address):
+    return bech32.encode(ADDRESS_PREFIXES.get(address[0] & 0x0f, 'addr_test'), address)
+
+"""
+A submitted transaction that is not confirmed yet.
+"""
+class PendingTransaction:
+    __slots__ = ('tx_id', 'inputs', 'outputs', 'ttl', 'depth', 'parents')
+
+    def __init__(self, tx_id, inputs, outputs, ttl, depth, parents):
+        self.tx_id = tx_id
+        self.inputs = inputs
+        self.outputs = outputs
+        self.ttl = ttl
+        self.depth = depth
+        self.parents = parents
+
+"""
+Local view of the UTxOs of our own submitted but unconfirmed transactions.
+
+A follow-up transaction can spend the outputs of a pending transaction right away
+instead of waiting a block, up to max_depth unconfirmed transactions in a chain. A
+transaction is confirmed once one of its outputs is seen on chain. When it expires
+before that, it is rolled back together with every transaction built on it.
+"""
+class Mempool:
+    def __init__(self, max_depth=MAX_CHAIN_DEPTH):
+        self.max_depth = max_depth
+        self.lock = threading.Lock()
+        self.transactions = OrderedDict()
+        self.spent = dict()
+        self.outputs = dict()
+
+    """
+    Adds a submitted transaction.
+
+    Args:
+        body: The encoded transaction body.
+
+    Returns:
+        The transaction ID or False if an input is already spent by a pending
+        transaction or the chain would get deeper than max_depth.
+    """
+    def add(self, body):
+        tx_id = hashlib.blake2b(body, digest_size=32).hexdigest()
+        decoded = loads(body)
+        inputs = [f'{tx_hash.hex()}#{tx_ix}' for tx_hash, tx_ix in decoded[0]]
+        outputs = dict()
+
+        for tx_ix, (address, value) in enumerate(decoded[1]):
+            # Outputs holding tokens are encoded as [lovelace, assets]
+            lovelace, assets = (value, dict()) if isinstance(value, int) else value
+            outputs[f'{tx_id}#{tx_ix}'] = UTxO(tx_id, tx_ix, encode_address(address), lovelace, assets)
+
+        with self.lock:
+            if any(key in self.spent for key in inputs):
+                return False
+
+            parents = {self.outputs[key] for key in inputs if key in self.outputs}
+            depth = 1 + max((self.transactions[parent].depth for parent in parents), default=0)
+
+            if depth > self.max_depth:
+                return False
+
+            self.transactions[tx_id] = PendingTransaction(tx_id, inputs, outputs, decoded.get(3), depth, parents)
+
+            for key in inputs:
+                self.spent[key] = tx_id
+
+            for key in outputs:
+                self.outputs[key] = tx_id
+
+        return tx_id
+
+    """
+    Gets the UTxOs of an address that can be spent, including pending outputs.
+
+    Args:
+        utxos: The confirmed UTxOs of the address, keyed by tx_hash#tx_ix.
+        address: The address.
+
+    Returns:
+        The list of spendable UTxOs, confirmed ones first.
+    """
+    def available(self, utxos, address):
+        with self.lock:
+            available = [utxo for key, utxo in utxos.items() if key not in self.spent]
+
+            for tx in self.transactions.values():
+                if tx.depth >= self.max_depth:
+                    continue
+
+                available += [utxo for key, utxo in tx.outputs.items()
+                    if utxo.address == address and key not in self.spent and key not in utxos]
+
+        return available
+
+    """
+    Updates the pending transactions with the UTxOs seen on chain.
+
+    Transactions with an output on chain are confirmed along with their ancestors and
+    transactions past their TTL are rolled back along with their descendants.
+
+    Args:
+        utxos: The UTxOs seen on chain, keyed by tx_hash#tx_ix.
+        slot: The current slot number.
+
+    Returns:
+        The IDs of the transactions that were rolled back.
+    """
+    def update(self, utxos, slot):
+        with self.lock:
+            confirmed = set()
+
+            for tx in self.transactions.values():
+                if any(key in utxos for key in tx.outputs):
+                    confirmed.add(tx.tx_id)
+
+            for tx_id in list(confirmed):
+                confirmed |= self.ancestors(tx_id)
+
+            for tx_id in confirmed:
+                self.forget(tx_id)
+
+            # Children of confirmed transactions are now closer to the chain
+            for tx in self.transactions.values():
+                tx.depth = 1 + max((self.transactions[parent].depth for parent in tx.parents
+                    if parent in self.transactions), default=0)
+
+            expired = [tx.tx_id for tx in self.transactions.values() if tx.ttl is not None and tx.ttl < slot]
+
+        dropped = []
+
+        for tx_id in expired:
+            dropped += self.drop(tx_id)
+
+        return dropped
+
+    """
+    Rolls back a transaction that was rejected or expired and every transaction built on it.
+
+    Args:
+        tx_id: The transaction ID.
+
+    Returns:
+        The IDs of the transactions that were rolled back.
+    """
+    def drop(self, tx_id):
+        with self.lock:
+            if tx_id not in self.transactions:
+                return []
+
+            dropped = [tx_id]
+
+            for tx in self.transactions.values():
+                if tx.parents & set(dropped):
+                    dropped.append(tx.tx_id)
+
+            for dropped_id in dropped:
+                self.forget(dropped_id)
+
+        return dropped
+
+    """
+    Gets the pending ancestors of a transaction, the caller holds the lock.
+
+    Args:
+        tx_id: The transaction ID.
+
+    Returns:
+        The set of ancestor transaction IDs.
+    """
+    def ancestors(self, tx_id):
+        ancestors = set()
+        stack = [tx_id]
+
+        while stack:
+            for parent in self.transactions[stack.pop()].parents:
+                if parent in self.transactions and parent not in ancestors:
+                    ancestors.add(parent)
+                    stack.append(parent)
+
+        return ancestors
+
+    """
+    Removes a transaction and its inputs and outputs, the caller holds the lock.
+
+    Args:
+        tx_id: The transaction ID.
+    """
+    def forget(self, tx_id):
+        tx = self.transactions.pop(tx_id, None)
+
+        if tx is None:
+            return
+
+        for key in tx.inputs:
+            if self.spent.get(key) == tx_id:
+                del self.spent[key]
+
+        for key in tx.outputs:
+            self.outputs.pop(key, None)
+
+    """
+    Gets the number of pending transactions.
+    """
+    def __len__(self):
+        with self.lock:
+            return len(self.transactions)
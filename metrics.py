@@ -0,0 +1,275 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import functools
+import threading
+import atexit
+import time
+import os
+
+METRICS_INTERVAL = 15
+# Seconds, from a fast cache hit to a slow node or API call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+"""
+Base of the metrics, keeping one value per combination of label values.
+
+Updates only take a lock and change a dict entry, so the metrics can stay on in
+production.
+"""
+class Metric:
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = dict()
+
+    """
+    Gets the key of the label values.
+
+    Args:
+        labels: The label values by label name.
+
+    Returns:
+        A tuple of the label values in the order of the label names.
+    """
+    def key(self, labels):
+        return tuple(str(labels.get(label, '')) for label in self.labels)
+
+    """
+    Formats the labels of a sample.
+
+    Args:
+        key: The label values.
+        extra: Extra (name, value) label pairs.
+
+    Returns:
+        The labels in Prometheus text format.
+    """
+    def format_labels(self, key, extra=()):
+        pairs = list(zip(self.labels, key)) + list(extra)
+
+        if not pairs:
+            return ''
+
+        escaped = [(name, value.replace('\\', '\\\\').replace('"', '\\"')) for name, value in pairs]
+        return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+    """
+    Renders the metric.
+
+    Returns:
+        The metric in Prometheus text format.
+    """
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+
+        with self.lock:
+            values = list(self.values.items())
+
+        for key, value in values:
+            lines.append(f'{self.name}{self.format_labels(key)} {value}')
+
+        return '\n'.join(lines)
+
+"""
+Counter that only goes up, such as the number of calls or the fees paid.
+"""
+class Counter(Metric):
+    type = 'counter'
+
+    """
+    Increments the counter.
+
+    Args:
+        amount: The amount to add.
+        labels: The label values by label name.
+    """
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+"""
+Gauge that is set to the current value, such as a queue depth.
+"""
+class Gauge(Metric):
+    type = 'gauge'
+
+    """
+    Sets the gauge.
+
+    Args:
+        value: The new value.
+        labels: The label values by label name.
+    """
+    def set(self, value, **labels):
+        key = self.key(labels)
+
+        with self.lock:
+            self.values[key] = value
+
+"""
+Histogram of observed values, such as latencies, with cumulative buckets.
+"""
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    """
+    Observes a value.
+
+    Args:
+        value: The observed value.
+        labels: The label values by label name.
+    """
+    def observe(self, value, **labels):
+        key = self.key(labels)
+
+        with self.lock:
+            counts = self.values.get(key)
+
+            if counts is None:
+                # One count per bucket, then the sum and the total count
+                counts = self.values[key] = [0] * len(self.buckets) + [0, 0]
+
+            for x, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[x] += 1
+                    break
+
+            counts[-2] += value
+            counts[-1] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+
+        with self.lock:
+            values = [(key, list(counts)) for key, counts in self.values.items()]
+
+        for key, counts in values:
+            cumulative = 0
+
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{self.format_labels(key, [("le", str(bound))])} {cumulative}')
+
+            lines.append(f'{self.name}_bucket{self.format_labels(key, [("le", "+Inf")])} {counts[-1]}')
+            lines.append(f'{self.name}_sum{self.format_labels(key)} {counts[-2]}')
+            lines.append(f'{self.name}_count{self.format_labels(key)} {counts[-1]}')
+
+        return '\n'.join(lines)
+
+"""
+Wraps a function so its duration is observed in a histogram.
+
+Args:
+    histogram: The histogram.
+    labels: The label values by label name.
+
+Returns:
+    The decorator.
+"""
+def timed(histogram, **labels):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+
+        return wrapper
+
+    return decorator
+
+CLI_CALLS = Counter('minter_cardano_cli_calls_total', 'cardano-cli invocations.', ['command', 'status'])
+CLI_SECONDS = Histogram('minter_cardano_cli_seconds', 'Duration of cardano-cli invocations.', ['command'])
+BLOCKFROST_REQUESTS = Counter('minter_blockfrost_requests_total', 'Blockfrost requests.', ['endpoint', 'status'])
+BLOCKFROST_RETRIES = Counter('minter_blockfrost_retries_total', 'Retried Blockfrost requests.', ['endpoint'])
+BLOCKFROST_SECONDS = Histogram('minter_blockfrost_seconds', 'Duration of Blockfrost requests, including retries.',
+    ['endpoint'])
+STAGE_SECONDS = Histogram('minter_stage_seconds', 'Duration of each stage of a request.', ['stage'])
+REQUESTS = Counter('minter_requests_total', 'Request state transitions.', ['kind', 'state'])
+QUEUE_DEPTH = Gauge('minter_queue_depth', 'Requests waiting in each queue.', ['queue'])
+FEES_PAID = Counter('minter_fees_lovelace_total', 'Fees of the submitted transactions in Lovelace.')
+TRANSACTIONS = Counter('minter_transactions_submitted_total', 'Submitted transactions.')
+CONFIRMATIONS = Counter('minter_confirmations_total', 'Tracked transactions by outcome.', ['state'])
+TEMPLATES = Counter('minter_templates_total', 'Mint template lookups by result.', ['result'])
+
+METRICS = [CLI_CALLS, CLI_SECONDS, BLOCKFROST_REQUESTS, BLOCKFROST_RETRIES, BLOCKFROST_SECONDS,
+    STAGE_SECONDS, REQUESTS, QUEUE_DEPTH, FEES_PAID, TRANSACTIONS, CONFIRMATIONS, TEMPLATES]
+
+"""
+Renders every metric.
+
+Returns:
+    The metrics in Prometheus text format.
+"""
+def render_metrics():
+    return '\n'.join(metric.render() for metric in METRICS) + '\n'
+
+"""
+Writes the metrics to a file for the node exporter textfile collector.
+
+The file is replaced atomically so the collector never reads a partial file.
+
+Args:
+    path: The filepath, ending in .prom.
+"""
+def write_metrics(path):
+    with open(f'{path}.tmp', 'w') as file:
+        file.write(render_metrics())
+
+    os.replace(f'{path}.tmp', path)
+
+"""
+Writes the metrics to a file every interval seconds and once more at exit.
+
+Args:
+    path: The filepath, ending in .prom.
+    interval: The time in seconds between writes.
+"""
+def start_metrics_writer(path, interval=METRICS_INTERVAL):
+    def write():
+        while True:
+            time.sleep(interval)
+            write_metrics(path)
+
+    threading.Thread(target=write, daemon=True).start()
+    atexit.register(write_metrics, path)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        data = render_metrics().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+"""
+Serves the metrics over HTTP for Prometheus to scrape.
+
+Args:
+    port: The port to listen on.
+    host: The interface to listen on, local only by default.
+
+Returns:
+    The HTTP server, served in a daemon thread.
+"""
+def start_metrics_server(port, host='127.0.0.1'):
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,334 @@
+from helpers import get_address
+from payers import get_payer_resolver
+from build_and_sign_transaction import (build_batch_transaction, build_template_transaction, build_transaction,
+    sign_transaction, submit_transaction_bytes)
+from monitor_mint_transactions import FEE, TEST_ADDRESSES, apply_confirmations, resume_signed, track_submitted
+from watcher import CardanoCliSource, UTxOWatcher
+from utxo import UTxOIndex
+from ledger import BUILT, DETECTED, SIGNED, SUBMITTED, Ledger
+from confirmations import ConfirmationTracker
+from templates import TemplateCache
+from pricing import Pricing
+from metrics import QUEUE_DEPTH
+import queue
+import threading
+import time
+
+BUILD_WORKERS = 4
+SIGN_WORKERS = 2
+SUBMIT_WORKERS = 2
+
+"""
+Hands out NFT IDs atomically so that no two workers mint the same ID.
+
+A failed request keeps its ID in the ledger and is retried with it, so IDs are never
+handed out twice.
+"""
+class IdAllocator:
+    def __init__(self, start, end):
+        self.lock = threading.Lock()
+        self.next_id = start
+        self.end = end
+        # A request whose transaction expired is submitted again under the same ID
+        self.committed = set()
+        self.total = end - start + 1
+
+    """
+    Allocates the next free NFT ID.
+
+    Returns:
+        The NFT ID or None if every ID is allocated.
+    """
+    def allocate(self):
+        with self.lock:
+            if self.next_id > self.end:
+                return None
+
+            id = self.next_id
+            self.next_id += 1
+            return id
+
+    """
+    Marks an NFT ID as submitted.
+
+    Args:
+        id: The NFT ID.
+    """
+    def commit(self, id):
+        with self.lock:
+            self.committed.add(id)
+
+    """
+    Checks whether every NFT ID has been submitted.
+
+    Returns:
+        A boolean indicating whether the allocator is exhausted.
+    """
+    def done(self):
+        with self.lock:
+            return len(self.committed) >= self.total
+
+"""
+Tracks the input UTxOs claimed by the workers so a tx_hash#tx_ix is never spent twice.
+
+A UTxO stays reserved after its transaction is submitted until it disappears from the
+minting address, since the node keeps returning it until the transaction is confirmed,
+or until its transaction expired and it has to be minted again.
+"""
+class UtxoReservations:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reserved = dict()
+
+    """
+    Reserves a UTxO.
+
+    Args:
+        utxo: The UTxO in tx_hash#tx_ix format.
+
+    Returns:
+        A boolean indicating whether the UTxO was free and is now reserved.
+    """
+    def reserve(self, utxo):
+        with self.lock:
+            if utxo in self.reserved:
+                return False
+
+            self.reserved[utxo] = False
+            return True
+
+    """
+    Releases a UTxO whose request failed.
+
+    Args:
+        utxo: The UTxO in tx_hash#tx_ix format.
+    """
+    def release(self, utxo):
+        with self.lock:
+            self.reserved.pop(utxo, None)
+
+    """
+    Marks a reserved UTxO as spent by a submitted transaction.
+
+    Args:
+        utxo: The UTxO in tx_hash#tx_ix format.
+    """
+    def mark_submitted(self, utxo):
+        with self.lock:
+            self.reserved[utxo] = True
+
+    """
+    Drops the reservations of submitted UTxOs that are no longer on chain or no longer in flight.
+
+    Args:
+        seen: The set of UTxOs returned by the last poll.
+        in_flight: Called with a UTxO, returns whether its transaction is still in flight.
+    """
+    def prune(self, seen, in_flight):
+        with self.lock:
+            for utxo in [utxo for utxo, submitted in self.reserved.items()
+                if submitted and (utxo not in seen or not in_flight(utxo))]:
+                del self.reserved[utxo]
+
+"""
+A mint request moving through the pipeline.
+"""
+class MintRequest:
+    def __init__(self, tx_hash, tx_ix, lovelace, id, refund=0):
+        self.tx_hash = tx_hash
+        self.tx_ix = tx_ix
+        self.lovelace = lovelace
+        self.id = id
+        self.refund = refund
+        self.utxo = f'{tx_hash}#{tx_ix}'
+        self.detected = time.time()
+        # The body and signed transaction are handed between the stages in memory
+        self.body = None
+        self.tx = None
+
+"""
+Runs the minting pipeline with separate build, sign and submit stages.
+
+Detected mint requests are queued and each stage runs with its own number of
+worker threads, so a slow cardano-cli call only holds up its own stage. Progress is
+recorded in the ledger, so a restarted pipeline skips the requests already in flight
+and continues after the highest recorded NFT ID. Requests whose transaction expired
+are minted again with their NFT ID.
+
+Args:
+    id: The starting ID for the new NFTs.
+    total_mint: The last NFT ID to mint.
+    chain: The Cardano chain.
+    build_workers: The number of build threads.
+    sign_workers: The number of sign threads.
+    submit_workers: The number of submit threads.
+    source: The chain source to watch, defaults to cardano-cli.
+    warm_up: The number of NFT IDs to prepare templates for ahead of time, 0 to disable.
+    pricing: The pricing of mint requests, defaults to one NFT for exactly FEE.
+
+Returns:
+    A boolean indicating whether the minting was successful.
+"""
+def run_pipeline(id, total_mint, chain='testnet-magic', build_workers=BUILD_WORKERS,
+    sign_workers=SIGN_WORKERS, submit_workers=SUBMIT_WORKERS, source=None, warm_up=0, pricing=None):
+    address = get_address()
+
+    if not address:
+        print('Error getting address...')
+        return False
+
+    ledger = Ledger()
+    ledger.forget_unsigned()
+    resume_signed(ledger, 'mint', chain)
+    id = ledger.next_id(id)
+    allocator = IdAllocator(id, total_mint)
+    pricing = pricing or Pricing(int(FEE))
+    reservations = UtxoReservations()
+    tracker = ConfirmationTracker(chain)
+    track_submitted(tracker, ledger)
+    tracker.start()
+    build_queue = queue.Queue()
+    sign_queue = queue.Queue()
+    submit_queue = queue.Queue()
+    templates = None
+
+    if warm_up:
+        templates = TemplateCache(address, total_mint, warm_up)
+        templates.warm(id)
+        templates.start()
+
+    def report_depths():
+        for name, stage_queue in [('build', build_queue), ('sign', sign_queue), ('submit', submit_queue)]:
+            QUEUE_DEPTH.set(stage_queue.qsize(), queue=name)
+
+    def fail(request, message):
+        print(message)
+        reservations.release(request.utxo)
+
+    def build_stage():
+        while True:
+            request = build_queue.get()
+            report_depths()
+
+            if request is None:
+                break
+
+            if chain == 'testnet-magic':
+                mint_address = TEST_ADDRESSES[(request.id-1) % len(TEST_ADDRESSES)]
+            else:
+                mint_address = get_payer_resolver().resolve(request.tx_hash)
+
+            if not mint_address:
+                fail(request, 'Error resolving payer address...')
+                continue
+
+            if request.refund:
+                # Overpayments within the tolerance go back to the payer with the NFT
+                result = build_batch_transaction([(request.tx_hash, request.tx_ix, mint_address, 1, request.refund)],
+                    address, request.id, chain=chain)
+                request.body = result[1] if result else None
+            else:
+                template = templates.take(request.id) if templates else None
+
+                if template:
+                    request.body = build_template_transaction(template, request.tx_hash, request.tx_ix,
+                        request.lovelace, mint_address, address, chain)
+
+                if not request.body:
+                    request.body = build_transaction(request.tx_hash, request.tx_ix, mint_address, address,
+                        request.id, chain=chain)
+
+            if request.body:
+                ledger.record(request.utxo, 'mint', BUILT, request.id)
+                sign_queue.put(request)
+            else:
+                fail(request, 'Error building mint transaction...')
+
+    def sign_stage():
+        while True:
+            request = sign_queue.get()
+            report_depths()
+
+            if request is None:
+                break
+
+            request.tx = sign_transaction(request.body, chain)
+            request.body = None
+
+            if request.tx:
+                ledger.record(request.utxo, 'mint', SIGNED, request.id, tx=request.tx)
+                submit_queue.put(request)
+            else:
+                fail(request, 'Error signing mint transaction...')
+
+    def submit_stage():
+        while True:
+            request = submit_queue.get()
+            report_depths()
+
+            if request is None:
+                break
+
+            if submit_transaction_bytes(request.tx, chain):
+                ledger.record(request.utxo, 'mint', SUBMITTED, request.id)
+                reservations.mark_submitted(request.utxo)
+                tracker.track(request.tx, 'mint')
+                allocator.commit(request.id)
+            else:
+                fail(request, 'Error submitting mint transaction...')
+
+    stages = [(build_stage, build_workers), (sign_stage, sign_workers), (submit_stage, submit_workers)]
+    threads = []
+
+    for stage, workers in stages:
+        stage_threads = [threading.Thread(target=stage, daemon=True) for _ in range(workers)]
+
+        for thread in stage_threads:
+            thread.start()
+
+        threads.append(stage_threads)
+
+    def detect(index):
+        queued = apply_confirmations(tracker, ledger, index)
+        reservations.prune(index.utxos, ledger.in_flight)
+
+        for utxo in index.next_pending():
+            if ledger.in_flight(utxo.key) or not reservations.reserve(utxo.key):
+                continue
+
+            record = ledger.get(utxo.key)
+            # A failed or interrupted request keeps its ID
+            nft_id = record[2] if record and record[2] is not None else allocator.allocate()
+
+            if nft_id is None:
+                reservations.release(utxo.key)
+                break
+
+            _, refund = pricing.quote(utxo.lovelace, 1)
+            ledger.record(utxo.key, 'mint', DETECTED, nft_id)
+            build_queue.put(MintRequest(utxo.tx_hash, utxo.tx_ix, utxo.lovelace, nft_id, refund))
+            queued = True
+
+        report_depths()
+
+        if templates:
+            templates.warm(allocator.next_id)
+
+        return queued
+
+    watcher = UTxOWatcher(source or CardanoCliSource(address, chain), UTxOIndex(accepts=pricing.accepts), ledger)
+    watcher.run(detect, lambda: not allocator.done())
+
+    for stage_queue, stage_threads in zip([build_queue, sign_queue, submit_queue], threads):
+        for _ in stage_threads:
+            stage_queue.put(None)
+
+        for thread in stage_threads:
+            thread.join()
+
+    tracker.stop()
+
+    if templates:
+        templates.stop()
+
+    return True
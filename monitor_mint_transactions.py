@@ -1,13 +1,20 @@
-from helpers import MAGIC, POLICY_DIR, get_address, get_mint_address, get_slot_number
-from build_and_sign_transaction import (OUT_DIR, REFUND_DIR, build_refund_transaction, 
-    build_transaction, calculate_refund_transaction_fee, sign_refund_transaction, 
-    sign_transaction, submit_transaction)
+from helpers import get_address
+from policy import create_policy
+from build_and_sign_transaction import (build_batch_refund_transaction,
+    build_batch_transaction, build_template_transaction, build_transaction, sign_refund_transaction,
+    sign_transaction, split_refunds, submit_transaction_bytes)
+from utxo import UTxOIndex
+from watcher import CardanoCliSource, UTxOWatcher
+from ledger import BUILT, CONFIRMED, DETECTED, SIGNED, SUBMITTED, Ledger
+from confirmations import ConfirmationTracker
+from payers import get_payer_resolver
+from templates import TemplateCache
+from pricing import MAX_QUANTITY, PRICE_TOLERANCE, Pricing
 import time
-import subprocess
 import sys
-import json
 
 FEE = '100000000'
+REFUND_WINDOW = 60
 VALID_CHAINS = ['testnet-magic', 'mainnet']
 # Manually generated test addresses in local directory
 TEST_ADDRESSES = [
@@ -16,196 +23,423 @@ TEST_ADDRESSES = [
     'addr_test1vz4yn0dplvj77v9ds8ysacmqj69jchm57y5ttmgpgwcyrfc85smgy']
 
 """
-Creates a policy.script file.
+Gets the transactions of the given address.
 
 Args:
-    mintable_time: The time in slots that the policy will be open for.
+    address: The address to check transactions for.
     chain: The Cardano chain.
 
 Returns:
-    A boolean indicating whether the transaction was successful.
+    The UTxOs of the address in the JSON format of cardano-cli query utxo --out-file.
 """
-def create_policy(mintable_time, chain='testnet-magic'):
-    create_args = ['cardano-cli', 'address', 'key-gen', '--verification-key-file', 
-        f'{POLICY_DIR}/policy.vkey', '--signing-key-file', f'{POLICY_DIR}/policy.skey']
-    
-    try:
-        res = subprocess.run(create_args, capture_output=True).stderr.decode()
-
-        if res:
-            print(res)
-            return False
-    except subprocess.CalledProcessError:
-        return False
+def get_tx_info(address, chain='testnet-magic'):
+    return CardanoCliSource(address, chain).query()
 
-    hash_args = ['cardano-cli', 'address', 'key-hash', '--payment-verification-key-file',
-        f'{POLICY_DIR}/policy.vkey']
+"""
+Resolves the payer addresses of every pending request of a poll in one concurrent batch.
 
-    try:
-        res = subprocess.run(hash_args, capture_output=True)
-
-        if res.stderr.decode():
-            print(res.stderr.decode())
-            return False
-        
-        key_hash = res.stdout.decode().strip()
-    except subprocess.CalledProcessError:
-        return False
-    
-    slot_number = get_slot_number(chain)
-
-    if slot_number:
-        policy = {'type': 'all', 'scripts': [
-            {'type': 'before', 'slot': slot_number+mintable_time},
-            {'type': 'sig', 'keyHash': key_hash}
-        ]}
-
-        with open(f'{POLICY_DIR}/policy.script', 'w') as file:
-            json.dump(policy, file)
-        
-        id_args = ['cardano-cli', 'transaction', 'policyid', '--script-file', 
-            f'{POLICY_DIR}/policy.script']
-        
-        try:
-            res = subprocess.run(id_args, capture_output=True)
-
-            if res.stderr.decode():
-                print(res.stderr.decode())
-                return False
-            
-            with open(f'{POLICY_DIR}/policyID', 'w') as file:
-                file.write(res.stdout.decode().strip())
-
-            return True
-        except subprocess.CalledProcessError:
-            return False
-    else:
-        print('Error getting slot number...')
-        return False
+Args:
+    index: The UTxO index of the minting address.
+    chain: The Cardano chain.
+"""
+def prefetch_payers(index, chain='testnet-magic'):
+    if chain != 'testnet-magic':
+        get_payer_resolver().resolve_many([utxo.tx_hash for utxo in index.next_pending()])
 
 """
-Gets the transactions of the given address.
+Resubmits the requests that were signed before a restart but not recorded as submitted.
+
+Resubmitting is safe since a transaction can only spend its input UTxO once. The
+requests of a batch share their transaction, so it is submitted once for all of them.
 
 Args:
-    address: The address to check transactions for.
+    ledger: The ledger of processed requests.
+    kind: The kind of request, mint or refund.
     chain: The Cardano chain.
+"""
+def resume_signed(ledger, kind, chain='testnet-magic'):
+    txs = dict()
+
+    for utxo, _, tx in ledger.signed(kind):
+        if tx is not None:
+            txs.setdefault(tx, []).append(utxo)
+
+    for tx, utxos in txs.items():
+        if not submit_transaction_bytes(tx, chain, kind):
+            print(f'Error resubmitting {kind} transaction for {", ".join(utxos)}...')
+            continue
+
+        for utxo in utxos:
+            ledger.record(utxo, kind, SUBMITTED)
+
+"""
+Tracks the confirmation of the requests submitted before a restart.
+
+Args:
+    tracker: The confirmation tracker.
+    ledger: The ledger of processed requests.
+"""
+def track_submitted(tracker, ledger):
+    # Requests of a batch share their transaction
+    txs = dict()
+
+    for _, kind, tx in ledger.submitted():
+        if tx is not None:
+            txs[tx] = kind
+
+    for tx, kind in txs.items():
+        tracker.track(tx, kind)
+
+"""
+Applies the confirmations and expiries found by the tracker to the ledger.
+
+The requests of expired transactions are queued again so they are built and
+submitted again.
+
+Args:
+    tracker: The confirmation tracker.
+    ledger: The ledger of processed requests.
+    index: The UTxO index of the minting address.
 
 Returns:
-    The unparsed transaction info in string format.
+    A boolean indicating whether any request was queued again.
 """
-def get_tx_info(address, chain='testnet-magic'):
-    args = ['cardano-cli', 'query', 'utxo', '--address', address, f'--{chain}']
+def apply_confirmations(tracker, ledger, index):
+    requeued = False
 
-    if chain == 'testnet-magic':
-        args.append(MAGIC)
-    
-    try:
-        tx_info = subprocess.run(args, capture_output=True).stdout.decode()
-    except subprocess.CalledProcessError:
-        return False
+    for state, inputs, kind in tracker.take_outcomes():
+        for utxo in inputs:
+            if state == CONFIRMED:
+                ledger.confirm(utxo)
+            else:
+                print(f'The {kind} transaction for {utxo} expired, building it again...')
+                ledger.expire(utxo)
+                index.requeue(utxo)
+                requeued = True
 
-    if tx_info:
-        return tx_info
-    else:
-        return False
+    return requeued
 
 """
 Finds the next minting transaction.
 
 Args:
-    tx_info: The unparsed transaction info in string format.
+    index: The UTxO index of the minting address.
 
 Returns:
     The transaction hash (None if no new minting transactions) and tx_ix
-
-Raises:
-    IndexError: Raised when the tx_info is incorrectly formatted.
 """
-def find_next_transaction(tx_info):
-    split_info = tx_info.split()
+def find_next_transaction(index):
+    pending = find_pending_transactions(index, 1)
 
-    for x in range(0,len(split_info)):
-        if len(split_info[x]) == 64:
-            tx_hash = split_info[x]
+    if pending:
+        return pending[0]
 
-            tx_ix = int(split_info[x+1])
-            amount = split_info[x+2]
+    return None, None
 
-            if amount == FEE:
-                return tx_hash, tx_ix
+"""
+Finds the pending minting transactions.
 
-    return None, None
+Args:
+    index: The UTxO index of the minting address.
+    limit: The maximum number of minting transactions to return.
+
+Returns:
+    A list of (tx_hash, tx_ix) tuples in the order they were first seen.
+"""
+def find_pending_transactions(index, limit):
+    return [(utxo.tx_hash, utxo.tx_ix) for utxo in index.next_pending(limit)]
 
 """
 Monitors for minting transactions and executes them.
 
+Progress is recorded in the ledger, so a restarted monitor skips the requests
+already in flight and continues after the highest recorded NFT ID.
+
 Args:
     id: The starting ID for the new NFTs.
     total_mint: The total number of new NFTs to mint.
     chain: The Cardano chain. 
+    batch_size: The maximum number of mint requests combined into one transaction.
+    source: The chain source to watch, defaults to cardano-cli.
+    warm_up: The number of NFT IDs to prepare templates for ahead of time, 0 to disable.
+    pricing: The pricing of mint requests, defaults to one NFT for exactly FEE.
 
 Returns:
     A boolean indicating whether the minting was successful.
 """
-def monitor(id, total_mint, chain='testnet-magic'):
+def monitor(id, total_mint, chain='testnet-magic', batch_size=1, source=None, warm_up=0, pricing=None):
     address = get_address()
 
     if not address:
         print('Error getting address...')
         return False
 
-    while id <= total_mint:
-        tx_info = get_tx_info(address, chain)
-
-        if tx_info:
-            try:
-                tx_hash, tx_ix = find_next_transaction(tx_info)
-
-                if tx_hash:
-                    if chain == 'testnet-magic':
-                        tx_response = {'inputs': [{'address': TEST_ADDRESSES[id-1]}]}
-                    else:
-                        tx_response = get_mint_address(tx_hash, chain)
-
-                    if 'error' not in tx_response:
-                        mint_address = tx_response['inputs'][0]['address']
-
-                        if build_transaction(tx_hash, tx_ix, mint_address, address, id, chain=chain):
-                            if sign_transaction(id, chain):
-                                if submit_transaction(f'{OUT_DIR}/matx{id}.signed', chain):
-                                    id+=1
-                                else:
-                                    print('Error submitting mint transaction...')
-                            else:
-                                print('Error signing mint transaction...')
-                        else:
-                            print('Error building mint transaction...')
-                    else:
-                        print(tx_response['error'])
-                else:
-                    time.sleep(5)
-                    continue
-            except IndexError:
-                print('Error when parsing transaction info...')
-        else:
-            print('Error when querying transaction info...')
-        
-        time.sleep(15)
-    
+    ledger = Ledger()
+    ledger.forget_unsigned()
+    resume_signed(ledger, 'mint', chain)
+    id = ledger.next_id(id)
+    pricing = pricing or Pricing(int(FEE))
+    index = UTxOIndex(accepts=pricing.accepts)
+    tracker = ConfirmationTracker(chain)
+    track_submitted(tracker, ledger)
+    tracker.start()
+    templates = None
+
+    # Batches build their transactions in one go, templates only cover single mints
+    if warm_up and batch_size == 1:
+        templates = TemplateCache(address, total_mint, warm_up)
+        templates.warm(id)
+        templates.start()
+
+    def handle(index):
+        nonlocal id
+        progress = apply_confirmations(tracker, ledger, index)
+        prefetch_payers(index, chain)
+
+        while id <= total_mint:
+            tx_hash, tx_ix = find_next_transaction(index)
+
+            if not tx_hash:
+                break
+
+            utxo = index.utxos[f'{tx_hash}#{tx_ix}']
+            record = ledger.get(utxo.key)
+
+            if record and record[2] is not None:
+                # A failed or interrupted request keeps its reserved IDs
+                quantity, refund = pricing.quote(utxo.lovelace, record[3] or 1)
+
+                if not mint_request(utxo, record[2], quantity, refund, address, ledger, chain, tracker, templates):
+                    break
+
+                index.handled(utxo.key)
+                id = max(id, record[2]+quantity)
+            elif batch_size > 1:
+                pending = []
+                available = total_mint-id+1
+
+                for utxo in index.next_pending(batch_size):
+                    quantity, refund = pricing.quote(utxo.lovelace, available)
+
+                    if not quantity:
+                        break
+
+                    pending.append((utxo.tx_hash, utxo.tx_ix, quantity, refund))
+                    available -= quantity
+
+                count = mint_batch(pending, address, id, ledger, chain, tracker)
+
+                if not count:
+                    break
+
+                for tx_hash, tx_ix, quantity, _ in pending[:count]:
+                    index.handled(f'{tx_hash}#{tx_ix}')
+                    id += quantity
+            else:
+                quantity, refund = pricing.quote(utxo.lovelace, total_mint-id+1)
+
+                if not mint_request(utxo, id, quantity, refund, address, ledger, chain, tracker, templates):
+                    break
+
+                index.handled(utxo.key)
+                id += quantity
+
+            progress = True
+
+        if templates:
+            templates.warm(id)
+
+        return progress
+
+    watcher = UTxOWatcher(source or CardanoCliSource(address, chain), index, ledger)
+    watcher.run(handle, lambda: id <= total_mint)
+    tracker.stop()
+
+    if templates:
+        templates.stop()
+
     return True
 
+"""
+Mints a single NFT for a pending request.
+
+Args:
+    tx_hash: The input transaction hash.
+    tx_ix: The input tx_ix.
+    lovelace: The amount of ADA (in Lovelace) of the input.
+    id: The ID of the NFT.
+    address: The minting address which receives the change.
+    ledger: The ledger of processed requests.
+    chain: The Cardano chain.
+    tracker: The confirmation tracker of the submitted transaction.
+    templates: The template cache to build from, when warm-up is enabled.
+
+Returns:
+    A boolean indicating whether the mint transaction was submitted.
+"""
+def mint_single(tx_hash, tx_ix, lovelace, id, address, ledger, chain='testnet-magic', tracker=None, templates=None):
+    utxo = f'{tx_hash}#{tx_ix}'
+
+    if chain == 'testnet-magic':
+        mint_address = TEST_ADDRESSES[id-1]
+    else:
+        mint_address = get_payer_resolver().resolve(tx_hash)
+
+    if not mint_address:
+        return False
+
+    ledger.record(utxo, 'mint', DETECTED, id)
+
+    body = None
+
+    if templates:
+        template = templates.take(id)
+
+        if template:
+            body = build_template_transaction(template, tx_hash, tx_ix, lovelace, mint_address, address, chain)
+
+    if not body:
+        body = build_transaction(tx_hash, tx_ix, mint_address, address, id, chain=chain)
+
+    if not body:
+        print('Error building mint transaction...')
+        return False
+
+    ledger.record(utxo, 'mint', BUILT)
+    tx = sign_transaction(body, chain)
+
+    if not tx:
+        print('Error signing mint transaction...')
+        return False
+
+    ledger.record(utxo, 'mint', SIGNED, tx=tx)
+
+    if not submit_transaction_bytes(tx, chain):
+        print('Error submitting mint transaction...')
+        return False
+
+    ledger.record(utxo, 'mint', SUBMITTED)
+
+    if tracker:
+        tracker.track(tx, 'mint')
+
+    return True
+
+"""
+Mints the NFTs a request paid for, a single NFT for an exact payment or several NFTs
+and a refund in one transaction otherwise.
+
+Args:
+    utxo: The UTxO of the mint request.
+    id: The ID of the first NFT.
+    quantity: The number of NFTs to mint.
+    refund: The amount of ADA (in Lovelace) sent back with the NFTs.
+    address: The minting address which receives the change.
+    ledger: The ledger of processed requests.
+    chain: The Cardano chain.
+    tracker: The confirmation tracker of the submitted transaction.
+    templates: The template cache to build from, when warm-up is enabled.
+
+Returns:
+    A boolean indicating whether the mint transaction was submitted.
+"""
+def mint_request(utxo, id, quantity, refund, address, ledger, chain='testnet-magic', tracker=None, templates=None):
+    if quantity == 1 and not refund:
+        return mint_single(utxo.tx_hash, utxo.tx_ix, utxo.lovelace, id, address, ledger, chain, tracker, templates)
+
+    return mint_batch([(utxo.tx_hash, utxo.tx_ix, quantity, refund)], address, id, ledger, chain, tracker) > 0
+
+"""
+Mints a batch of pending requests in a single transaction.
+
+Args:
+    pending: A list of (tx_hash, tx_ix, quantity, refund) tuples for the mint requests.
+    address: The minting address which receives the change.
+    id: The ID of the first NFT in the batch.
+    ledger: The ledger of processed requests.
+    chain: The Cardano chain.
+    tracker: The confirmation tracker of the submitted transaction.
+
+Returns:
+    The number of requests minted, 0 if the batch was not submitted.
+"""
+def mint_batch(pending, address, id, ledger, chain='testnet-magic', tracker=None):
+    requests = []
+
+    if chain != 'testnet-magic':
+        payers = get_payer_resolver().resolve_many([tx_hash for tx_hash, _, _, _ in pending])
+
+    for x, (tx_hash, tx_ix, quantity, refund) in enumerate(pending):
+        if chain == 'testnet-magic':
+            mint_address = TEST_ADDRESSES[(id+x-1) % len(TEST_ADDRESSES)]
+        else:
+            mint_address = payers[tx_hash]
+
+        if not mint_address:
+            break
+
+        requests.append((tx_hash, tx_ix, mint_address, quantity, refund))
+
+    if not requests:
+        return 0
+
+    nft_id = id
+
+    for tx_hash, tx_ix, _, quantity, _ in requests:
+        ledger.record(f'{tx_hash}#{tx_ix}', 'mint', DETECTED, nft_id, quantity=quantity)
+        nft_id += quantity
+
+    result = build_batch_transaction(requests, address, id, chain=chain)
+
+    if not result:
+        print('Error building batch mint transaction...')
+        return 0
+
+    count, body = result
+    utxos = [f'{tx_hash}#{tx_ix}' for tx_hash, tx_ix, _, _, _ in requests[:count]]
+
+    for utxo in utxos:
+        ledger.record(utxo, 'mint', BUILT)
+
+    tx = sign_transaction(body, chain)
+
+    if not tx:
+        print('Error signing batch mint transaction...')
+        return 0
+
+    for utxo in utxos:
+        ledger.record(utxo, 'mint', SIGNED, tx=tx)
+
+    if not submit_transaction_bytes(tx, chain):
+        print('Error submitting batch mint transaction...')
+        return 0
+
+    for utxo in utxos:
+        ledger.record(utxo, 'mint', SUBMITTED)
+
+    if tracker:
+        tracker.track(tx, 'mint')
+
+    return count
+
 """
 Monitors for late minters and refunds them.
 
+Late payments are gathered for up to window seconds and refunded together in as few
+transactions as possible. Requests that paid in time but whose mint transaction expired
+are minted again with their NFT ID instead.
+
 Args:
-    past_tx: The previous minting transaction.
     refund_time: The time in seconds to monitor for late minters.
     chain: The Cardano chain.
+    source: The chain source to watch, defaults to cardano-cli.
+    window: The time in seconds a late payment may wait to be refunded with others.
+    pricing: The pricing of mint requests, defaults to one NFT for exactly FEE.
 
 Returns:
     A boolean indicating whether the total refund time has been met.
 """
-def refund_late_minters(refund_time=14400, chain='testnet-magic'):
+def refund_late_minters(refund_time=14400, chain='testnet-magic', source=None, window=REFUND_WINDOW, pricing=None):
     start = time.time()
     address = get_address()
 
@@ -213,53 +447,132 @@ def refund_late_minters(refund_time=14400, chain='testnet-magic'):
         print('Error getting address...')
         return False
 
-    while (time.time() - start) <= refund_time:
-        tx_info = get_tx_info(address, chain)
-
-        if tx_info:
-            try:
-                tx_hash, tx_ix = find_next_transaction(tx_info)
-
-                if tx_hash:
-                    if chain == 'testnet-magic':
-                        tx_response = {'inputs': [{'address': TEST_ADDRESSES[2]}]}
-                    else:
-                        tx_response = get_mint_address(tx_hash)
-
-                    if 'error' not in tx_response:
-                        mint_address = tx_response['inputs'][0]['address']
-                        fee = calculate_refund_transaction_fee(tx_hash, tx_ix, mint_address,
-                            FEE, chain)
-                        
-                        if fee:
-                            if build_refund_transaction(tx_hash, tx_ix, mint_address, int(FEE) - int(fee), fee):
-                                if sign_refund_transaction(tx_ix, mint_address, chain):
-                                    if not submit_transaction(f'{REFUND_DIR}/tx{mint_address}.signed', chain):
-                                        print('Error submitting refund transaction...')
-                                else:
-                                    print('Error signing refund transaction...')
-                            else:
-                                print('Error building refund transaction...')
-                        else:
-                            print('Error calculating refund fee...')
-                    else:
-                        print(tx_response['error'])
-                else:
-                    time.sleep(5)
-                    continue
-            except IndexError:
-                print('Error when parsing transaction info...')
-        else:
-            print('Error when querying transaction info...')
+    ledger = Ledger()
+    resume_signed(ledger, 'refund', chain)
+    pricing = pricing or Pricing(int(FEE))
+    index = UTxOIndex(accepts=pricing.accepts)
+    first_seen = dict()
+    tracker = ConfirmationTracker(chain)
+    track_submitted(tracker, ledger)
+    tracker.start()
+
+    def handle(index):
+        now = time.time()
+        progress = apply_confirmations(tracker, ledger, index)
+        pending = []
+
+        for utxo in index.next_pending():
+            record = ledger.get(utxo.key)
+
+            if record and record[0] == 'mint' and record[2] is not None:
+                quantity, refund = pricing.quote(utxo.lovelace, record[3] or 1)
+
+                if mint_request(utxo, record[2], quantity, refund, address, ledger, chain, tracker):
+                    index.handled(utxo.key)
+                    progress = True
+            else:
+                pending.append(utxo)
+                first_seen.setdefault(utxo.key, now)
+
+        if not pending:
+            return progress
 
-        time.sleep(15)
+        oldest = min(first_seen[utxo.key] for utxo in pending)
 
+        if now - oldest < window and start + refund_time - now > window:
+            return progress
+
+        refunded = refund_batch(pending, ledger, chain, tracker)
+
+        for utxo in refunded:
+            index.handled(utxo.key)
+            first_seen.pop(utxo.key, None)
+
+        return progress or len(refunded) > 0
+
+    watcher = UTxOWatcher(source or CardanoCliSource(address, chain), index, ledger)
+    watcher.run(handle, lambda: (time.time() - start) <= refund_time)
+    tracker.stop()
     return True
-    
+
+"""
+Refunds late mint requests in batched transactions.
+
+Args:
+    pending: The UTxOs of the late mint requests.
+    ledger: The ledger of processed requests.
+    chain: The Cardano chain.
+    tracker: The confirmation tracker of the submitted transactions.
+
+Returns:
+    The list of UTxOs whose refund transaction was submitted.
+"""
+def refund_batch(pending, ledger, chain='testnet-magic', tracker=None):
+    refunds = []
+    refunded = []
+
+    if chain != 'testnet-magic':
+        payers = get_payer_resolver().resolve_many([utxo.tx_hash for utxo in pending])
+
+    for utxo in pending:
+        mint_address = TEST_ADDRESSES[2] if chain == 'testnet-magic' else payers[utxo.tx_hash]
+
+        if mint_address:
+            refunds.append((utxo.tx_hash, utxo.tx_ix, mint_address, utxo.lovelace))
+
+    for group in split_refunds(refunds):
+        utxos = [f'{tx_hash}#{tx_ix}' for tx_hash, tx_ix, _, _ in group]
+
+        for utxo in utxos:
+            ledger.record(utxo, 'refund', DETECTED)
+
+        body = build_batch_refund_transaction(group, chain)
+
+        if not body:
+            print('Error building refund transaction...')
+            continue
+
+        for utxo in utxos:
+            ledger.record(utxo, 'refund', BUILT)
+
+        tx = sign_refund_transaction(body, chain)
+
+        if not tx:
+            print('Error signing refund transaction...')
+            continue
+
+        for utxo in utxos:
+            ledger.record(utxo, 'refund', SIGNED, tx=tx)
+
+        if not submit_transaction_bytes(tx, chain, 'refund'):
+            print('Error submitting refund transaction...')
+            continue
+
+        for utxo in utxos:
+            ledger.record(utxo, 'refund', SUBMITTED)
+
+        if tracker:
+            tracker.track(tx, 'refund')
+
+        refunded += [utxo for utxo in pending if utxo.key in utxos]
+
+    return refunded
+
 if __name__ == '__main__':
     chain = 'testnet-magic'
+    starting_id = 1
     refund_time = 14400
+    refund_window = REFUND_WINDOW
     new_policy = True
+    batch_size = 1
+    pipeline = False
+    workers = dict()
+    metrics_port = None
+    metrics_file = None
+    archive_file = None
+    warm_up = 0
+    max_quantity = MAX_QUANTITY
+    price_tolerance = PRICE_TOLERANCE
 
     for x in range(0,len(sys.argv)):
         if sys.argv[x] == '--starting-id':
@@ -268,8 +581,28 @@ if __name__ == '__main__':
             total_mint = int(sys.argv[x+1].strip())
         elif sys.argv[x] == '--chain':
             chain = sys.argv[x+1]
+        elif sys.argv[x] == '--batch-size':
+            batch_size = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--pipeline':
+            pipeline = sys.argv[x+1].lower() == 'true'
+        elif sys.argv[x] in ('--build-workers', '--sign-workers', '--submit-workers'):
+            workers[sys.argv[x][2:].replace('-', '_')] = int(sys.argv[x+1].strip())
         elif sys.argv[x] == '--refund-time':
             refund_time = int(sys.argv[x+1])
+        elif sys.argv[x] == '--refund-window':
+            refund_window = int(sys.argv[x+1])
+        elif sys.argv[x] == '--metrics-port':
+            metrics_port = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--metrics-file':
+            metrics_file = sys.argv[x+1].strip()
+        elif sys.argv[x] == '--archive-file':
+            archive_file = sys.argv[x+1].strip()
+        elif sys.argv[x] == '--warm-up':
+            warm_up = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--max-quantity':
+            max_quantity = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--price-tolerance':
+            price_tolerance = int(sys.argv[x+1].strip())
         elif sys.argv[x] == '--create-policy':
             if sys.argv[x+1].lower() == 'false':
                 new_policy = False
@@ -280,19 +613,47 @@ if __name__ == '__main__':
     assert chain in VALID_CHAINS, f'Invalid argument for chain: {chain}'
     assert total_mint >= 1, f'Invalid argument for total mint: {total_mint}'
     assert refund_time >= 0, f'Invalid argument for refund time: {refund_time}'
+    assert refund_window >= 0, f'Invalid argument for refund window: {refund_window}'
+    assert batch_size >= 1, f'Invalid argument for batch size: {batch_size}'
+    assert warm_up >= 0, f'Invalid argument for warm-up: {warm_up}'
+    assert max_quantity >= 1, f'Invalid argument for max quantity: {max_quantity}'
+    assert not pipeline or max_quantity == 1, 'The pipeline only mints single NFTs'
+    assert all(count >= 1 for count in workers.values()), f'Invalid argument for workers: {workers}'
 
     if new_policy:
         assert mintable_time > 0, f'Invalid argument for mintable time: {mintable_time}'
+
+    try:
+        pricing = Pricing(int(FEE), max_quantity, price_tolerance)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    if metrics_port is not None:
+        from metrics import start_metrics_server
+        start_metrics_server(metrics_port)
+
+    if metrics_file:
+        from metrics import start_metrics_writer
+        start_metrics_writer(metrics_file)
+
+    if archive_file:
+        from artifacts import enable_archive
+        enable_archive(archive_file)
     
     if new_policy:
         policy_status = create_policy(mintable_time, chain)
 
     if not new_policy or policy_status:
-        res_monitor = monitor(starting_id, total_mint, chain)
+        if pipeline:
+            from mint_pipeline import run_pipeline
+            res_monitor = run_pipeline(starting_id, total_mint, chain, warm_up=warm_up, pricing=pricing, **workers)
+        else:
+            res_monitor = monitor(starting_id, total_mint, chain, batch_size, warm_up=warm_up, pricing=pricing)
 
         if res_monitor:
             print('Minting has ended!')
-            res_refund = refund_late_minters(refund_time, chain)
+            res_refund = refund_late_minters(refund_time, chain, window=refund_window, pricing=pricing)
 
             if res_refund:
                 print('Refunds have ended.')
@@ -0,0 +1,151 @@
+from helpers import get_mint_address
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import threading
+import sqlite3
+
+PAYERS_DIR = './payers.db'
+CACHE_SIZE = 10000
+RESOLVE_WORKERS = 8
+
+"""
+Resolves the address that paid for a mint request from its transaction hash.
+
+Resolved addresses are kept in an in-memory LRU cache backed by an SQLite table, so
+a transaction is only looked up on Blockfrost once.
+"""
+class PayerResolver:
+    def __init__(self, path=PAYERS_DIR, size=CACHE_SIZE, workers=RESOLVE_WORKERS):
+        self.size = size
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.cache = OrderedDict()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('CREATE TABLE IF NOT EXISTS payers (tx_hash TEXT PRIMARY KEY, address TEXT NOT NULL)')
+        self.connection.commit()
+
+    """
+    Looks up a payer address in the caches.
+
+    Args:
+        tx_hash: The transaction hash.
+
+    Returns:
+        The payer address or None if it is not cached.
+    """
+    def cached(self, tx_hash):
+        with self.lock:
+            if tx_hash in self.cache:
+                self.cache.move_to_end(tx_hash)
+                return self.cache[tx_hash]
+
+            row = self.connection.execute('SELECT address FROM payers WHERE tx_hash = ?', (tx_hash,)).fetchone()
+
+            if row is None:
+                return None
+
+            self.remember(tx_hash, row[0])
+            return row[0]
+
+    """
+    Adds a payer address to the LRU cache, the caller holds the lock.
+
+    Args:
+        tx_hash: The transaction hash.
+        address: The payer address.
+    """
+    def remember(self, tx_hash, address):
+        self.cache[tx_hash] = address
+        self.cache.move_to_end(tx_hash)
+
+        if len(self.cache) > self.size:
+            self.cache.popitem(last=False)
+
+    """
+    Looks up a payer address on Blockfrost.
+
+    Args:
+        tx_hash: The transaction hash.
+
+    Returns:
+        The payer address or False if the lookup failed.
+    """
+    def fetch(self, tx_hash):
+        tx_response = get_mint_address(tx_hash)
+
+        if 'error' in tx_response:
+            print(tx_response['error'])
+            return False
+
+        return tx_response['inputs'][0]['address']
+
+    """
+    Resolves the payer address of a transaction.
+
+    Args:
+        tx_hash: The transaction hash.
+
+    Returns:
+        The payer address or False if the lookup failed.
+    """
+    def resolve(self, tx_hash):
+        return self.resolve_many([tx_hash])[tx_hash]
+
+    """
+    Resolves the payer addresses of several transactions.
+
+    Duplicate hashes are looked up once and the uncached ones are looked up concurrently.
+
+    Args:
+        tx_hashes: The transaction hashes.
+
+    Returns:
+        A dict of the payer addresses keyed by transaction hash, False for failed lookups.
+    """
+    def resolve_many(self, tx_hashes):
+        addresses = dict()
+        missing = []
+
+        for tx_hash in dict.fromkeys(tx_hashes):
+            address = self.cached(tx_hash)
+
+            if address is None:
+                missing.append(tx_hash)
+            else:
+                addresses[tx_hash] = address
+
+        if not missing:
+            return addresses
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(missing))) as executor:
+            fetched = dict(zip(missing, executor.map(self.fetch, missing)))
+
+        with self.lock:
+            resolved = [(tx_hash, address) for tx_hash, address in fetched.items() if address]
+
+            for tx_hash, address in resolved:
+                self.remember(tx_hash, address)
+
+            self.connection.executemany('INSERT OR REPLACE INTO payers VALUES (?, ?)', resolved)
+            self.connection.commit()
+
+        addresses.update(fetched)
+        return addresses
+
+payer_resolver = None
+payer_resolver_lock = threading.Lock()
+
+"""
+Gets the payer resolver shared by the process.
+
+Returns:
+    The payer resolver.
+"""
+def get_payer_resolver():
+    global payer_resolver
+
+    with payer_resolver_lock:
+        if payer_resolver is None:
+            payer_resolver = PayerResolver()
+
+    return payer_resolver
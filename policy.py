@@ -0,0 +1,171 @@
+from helpers import POLICY_DIR, get_slot_number
+from transaction import generate_signing_key, load_signing_key
+from cbor import dumps
+import threading
+import hashlib
+import json
+import os
+
+POLICY_SKEY_DIR = f'{POLICY_DIR}/policy.skey'
+POLICY_VKEY_DIR = f'{POLICY_DIR}/policy.vkey'
+POLICY_SCRIPT_DIR = f'{POLICY_DIR}/policy.script'
+POLICY_ID_DIR = f'{POLICY_DIR}/policyID'
+# Tags of the native script constructors in the ledger CDDL
+SCRIPT_TAGS = {'sig': 0, 'all': 1, 'any': 2, 'atLeast': 3, 'after': 4, 'before': 5}
+# Prefix of native scripts when hashed into a policy ID
+NATIVE_SCRIPT_PREFIX = b'\x00'
+
+policy_id = None
+policy_lock = threading.Lock()
+policy_script_size = None
+
+"""
+Computes the key hash of a verification key, as cardano-cli address key-hash does.
+
+Args:
+    public: The 32-byte public key.
+
+Returns:
+    The key hash in hex.
+"""
+def get_key_hash(public):
+    return hashlib.blake2b(public, digest_size=28).hexdigest()
+
+"""
+Builds a policy that only the policy key can mint with, until a given slot.
+
+Args:
+    key_hash: The key hash of the policy key in hex.
+    slot: The slot from which minting is closed.
+
+Returns:
+    The policy in the JSON format of cardano-cli.
+"""
+def build_policy_script(key_hash, slot):
+    return {'type': 'all', 'scripts': [
+        {'type': 'before', 'slot': slot},
+        {'type': 'sig', 'keyHash': key_hash}
+    ]}
+
+"""
+Converts a native script from the JSON format of cardano-cli to its ledger form.
+
+Args:
+    script: The native script in JSON format.
+
+Returns:
+    The native script as nested lists, ready to be encoded.
+
+Raises:
+    ValueError: Raised when the script type is not supported.
+"""
+def native_script(script):
+    type = script.get('type')
+
+    if type == 'sig':
+        return [SCRIPT_TAGS[type], bytes.fromhex(script['keyHash'])]
+    elif type in ('all', 'any'):
+        return [SCRIPT_TAGS[type], [native_script(item) for item in script['scripts']]]
+    elif type == 'atLeast':
+        return [SCRIPT_TAGS[type], script['required'], [native_script(item) for item in script['scripts']]]
+    elif type in ('after', 'before'):
+        return [SCRIPT_TAGS[type], script['slot']]
+
+    raise ValueError(f'Unsupported native script type: {type}')
+
+"""
+Computes the policy ID of a native script, as cardano-cli transaction policyid does.
+
+Args:
+    script: The native script in JSON format.
+
+Returns:
+    The policy ID in hex.
+
+Raises:
+    ValueError: Raised when the script type is not supported.
+"""
+def get_script_policy_id(script):
+    return hashlib.blake2b(NATIVE_SCRIPT_PREFIX + dumps(native_script(script)), digest_size=28).hexdigest()
+
+"""
+Creates the policy keys, policy.script and policyID files.
+
+An existing policy key is kept so a key that controls a live policy is never lost.
+
+Args:
+    mintable_time: The time in slots that the policy will be open for.
+    chain: The Cardano chain.
+
+Returns:
+    A boolean indicating whether the policy was created.
+"""
+def create_policy(mintable_time, chain='testnet-magic'):
+    global policy_id
+
+    if os.path.exists(POLICY_SKEY_DIR):
+        _, public = load_signing_key(POLICY_SKEY_DIR)
+    else:
+        public = generate_signing_key(POLICY_SKEY_DIR, POLICY_VKEY_DIR)
+
+    slot_number = get_slot_number(chain, max_age=0)
+
+    if not slot_number:
+        print('Error getting slot number...')
+        return False
+
+    script = build_policy_script(get_key_hash(public), slot_number+mintable_time)
+    script_policy_id = get_script_policy_id(script)
+
+    with open(POLICY_SCRIPT_DIR, 'w') as file:
+        json.dump(script, file)
+
+    with open(POLICY_ID_DIR, 'w') as file:
+        file.write(script_policy_id)
+
+    with policy_lock:
+        policy_id = script_policy_id
+
+    return True
+
+"""
+Gets the policy ID, computing it from policy.script only on the first call.
+
+Returns:
+    The policy ID or False if the policy was not found.
+"""
+def get_policy_id():
+    global policy_id
+
+    with policy_lock:
+        if policy_id is None:
+            try:
+                with open(POLICY_SCRIPT_DIR, 'r') as file:
+                    policy_id = get_script_policy_id(json.load(file))
+            except (FileNotFoundError, ValueError, KeyError):
+                # Policies made with other tools may only come with a policyID file
+                try:
+                    with open(POLICY_ID_DIR, 'r') as file:
+                        policy_id = file.readline().strip() or None
+                except FileNotFoundError:
+                    pass
+
+        return policy_id or False
+
+"""
+Gets the size of the encoded minting script, reading policy.script only on the first call.
+
+Returns:
+    The size in bytes or None if the policy was not found.
+"""
+def get_policy_script_size():
+    global policy_script_size
+
+    if policy_script_size is None:
+        try:
+            with open(POLICY_SCRIPT_DIR, 'r') as file:
+                policy_script_size = len(dumps(native_script(json.load(file))))
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    return policy_script_size
@@ -0,0 +1,82 @@
+from fees import calculate_min_utxo
+
+MAX_QUANTITY = 1
+# Lovelace a payment may differ from a multiple of the price, 0 only accepts exact multiples
+PRICE_TOLERANCE = 0
+
+"""
+Turns a payment into the number of NFTs it buys and the Lovelace to refund with them.
+
+A payment of k times the price, give or take the tolerance, buys k NFTs for k up to
+max_quantity. Anything paid over k times the price goes back to the payer in the mint
+transaction. Other amounts are not mint requests, and the tolerance has to stay well
+below the minimum UTxO so the change of a mint never looks like a payment.
+
+Raises:
+    ValueError: Raised when the tolerance is negative or not below the minimum UTxO.
+"""
+class Pricing:
+    def __init__(self, price, max_quantity=MAX_QUANTITY, tolerance=PRICE_TOLERANCE):
+        if tolerance < 0:
+            raise ValueError(f'Invalid price tolerance: {tolerance}')
+
+        if tolerance:
+            min_utxo = calculate_min_utxo()
+
+            if not min_utxo:
+                raise ValueError('Error loading protocol parameters to check the price tolerance')
+
+            if tolerance >= min_utxo:
+                raise ValueError(f'The price tolerance must stay below the minimum UTxO of {min_utxo} Lovelace')
+
+        self.price = price
+        self.max_quantity = max_quantity
+        self.tolerance = tolerance
+
+    """
+    Gets the number of NFTs a payment buys.
+
+    Args:
+        lovelace: The amount of ADA (in Lovelace) paid.
+
+    Returns:
+        The number of NFTs, 0 if the payment is not a mint request.
+    """
+    def quantity(self, lovelace):
+        quantity = (lovelace + self.tolerance) // self.price
+
+        if quantity < 1 or quantity > self.max_quantity or abs(lovelace - quantity*self.price) > self.tolerance:
+            return 0
+
+        return quantity
+
+    """
+    Checks whether a payment is a mint request.
+
+    Args:
+        lovelace: The amount of ADA (in Lovelace) paid.
+
+    Returns:
+        A boolean indicating whether the payment buys at least one NFT.
+    """
+    def accepts(self, lovelace):
+        return self.quantity(lovelace) > 0
+
+    """
+    Quotes a payment, capping the quantity when fewer NFTs are left.
+
+    Args:
+        lovelace: The amount of ADA (in Lovelace) paid.
+        available: The number of NFTs left to mint, unlimited when None.
+
+    Returns:
+        A (quantity, refund) tuple with the number of NFTs to mint and the Lovelace to
+        send back with them.
+    """
+    def quote(self, lovelace, available=None):
+        quantity = self.quantity(lovelace)
+
+        if available is not None:
+            quantity = max(min(quantity, available), 0)
+
+        return quantity, max(lovelace - quantity*self.price, 0)
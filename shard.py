@@ -0,0 +1,205 @@
+from monitor_mint_transactions import VALID_CHAINS
+from transaction import generate_signing_key
+from policy import create_policy
+from helpers import POLICY_DIR
+from image_cache import HASHES_DIR
+import subprocess
+import hashlib
+import bech32
+import json
+import sys
+import os
+
+SHARDS_DIR = './shards'
+ALLOCATION_DIR = f'{SHARDS_DIR}/allocation.json'
+MONITOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'monitor_mint_transactions.py')
+# Shared between the shards, IDs are disjoint so their files never collide
+SHARED_PATHS = ['policy', 'img', 'metadata', 'protocol.json', 'hashes.json', '.env']
+# Header byte of an enterprise address with a key hash payment part
+ENTERPRISE_HEADERS = {'testnet-magic': 0x60, 'mainnet': 0x61}
+ADDRESS_PREFIXES = {'testnet-magic': 'addr_test', 'mainnet': 'addr'}
+
+"""
+Generates a payment key pair and its enterprise address in a shard directory.
+
+The files match those of cardano-cli address key-gen and address build.
+
+Args:
+    path: The shard directory.
+    chain: The Cardano chain.
+
+Returns:
+    The payment address.
+"""
+def generate_payment_keys(path, chain='testnet-magic'):
+    public = generate_signing_key(f'{path}/payment.skey', f'{path}/payment.vkey')
+    key_hash = hashlib.blake2b(public, digest_size=28).digest()
+    address = bech32.encode(ADDRESS_PREFIXES[chain], bytes([ENTERPRISE_HEADERS[chain]]) + key_hash)
+
+    with open(f'{path}/payment.addr', 'w') as file:
+        file.write(address)
+
+    return address
+
+"""
+Splits an ID range into contiguous ranges of nearly equal size.
+
+Args:
+    start_id: The first NFT ID.
+    end_id: The last NFT ID.
+    shards: The number of ranges.
+
+Returns:
+    A list of (start, end) tuples, ranges are never empty.
+"""
+def split_ids(start_id, end_id, shards):
+    size, extra = divmod(end_id - start_id + 1, shards)
+    ranges = []
+
+    for x in range(shards):
+        end = start_id + size + (1 if x < extra else 0) - 1
+        ranges.append((start_id, end))
+        start_id = end + 1
+
+    return ranges
+
+"""
+Checks that the ID ranges of an allocation do not overlap.
+
+Args:
+    allocation: A list of shards with start and end IDs.
+
+Returns:
+    A boolean indicating whether the ranges are disjoint.
+"""
+def ranges_disjoint(allocation):
+    ranges = sorted((shard['start'], shard['end']) for shard in allocation)
+    return all(previous[1] < current[0] for previous, current in zip(ranges, ranges[1:]))
+
+"""
+Gets the shard allocation, creating the shard directories on the first call.
+
+The allocation is persisted, so a restarted coordinator gives every shard the same
+ID range and key and no token name can be minted by two shards.
+
+Args:
+    start_id: The first NFT ID.
+    end_id: The last NFT ID.
+    shards: The number of shards.
+    chain: The Cardano chain.
+
+Returns:
+    A list of shards with their directory, address and start and end IDs or False if
+    a different allocation already exists.
+"""
+def get_allocation(start_id, end_id, shards, chain='testnet-magic'):
+    try:
+        with open(ALLOCATION_DIR, 'r') as file:
+            allocation = json.load(file)
+
+        ranges = [(shard['start'], shard['end']) for shard in allocation]
+
+        if ranges != split_ids(start_id, end_id, shards):
+            print(f'Shards were allocated as {ranges}, remove {ALLOCATION_DIR} to reallocate...')
+            return False
+
+        return allocation
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(SHARDS_DIR, exist_ok=True)
+    allocation = []
+
+    # Created up front so every shard links to the one image hash cache
+    if not os.path.exists(HASHES_DIR):
+        with open(HASHES_DIR, 'w') as file:
+            json.dump(dict(), file)
+
+    for x, (start, end) in enumerate(split_ids(start_id, end_id, shards)):
+        path = f'{SHARDS_DIR}/shard{x}'
+        os.makedirs(path, exist_ok=True)
+
+        for name in SHARED_PATHS:
+            if os.path.exists(name) and not os.path.lexists(f'{path}/{name}'):
+                os.symlink(os.path.abspath(name), f'{path}/{name}')
+
+        if os.path.exists(f'{path}/payment.addr'):
+            with open(f'{path}/payment.addr', 'r') as file:
+                address = file.readline().strip()
+        else:
+            address = generate_payment_keys(path, chain)
+
+        allocation.append({'dir': path, 'address': address, 'start': start, 'end': end})
+
+    assert ranges_disjoint(allocation), f'Overlapping shard ranges: {allocation}'
+
+    with open(f'{ALLOCATION_DIR}.tmp', 'w') as file:
+        json.dump(allocation, file, indent=4)
+
+    os.replace(f'{ALLOCATION_DIR}.tmp', ALLOCATION_DIR)
+    return allocation
+
+"""
+Runs a monitor per shard and waits for all of them.
+
+Every worker process runs in its shard directory, so it watches and signs with the
+shard key while sharing the policy, images and metadata of the drop.
+
+Args:
+    allocation: The shard allocation.
+    chain: The Cardano chain.
+    worker_args: Extra arguments passed to every monitor.
+
+Returns:
+    A boolean indicating whether every worker exited successfully.
+"""
+def run_shards(allocation, chain='testnet-magic', worker_args=()):
+    workers = []
+
+    for shard in allocation:
+        print(f'Shard {shard["dir"]} mints {shard["start"]} to {shard["end"]} at {shard["address"]}')
+        args = [sys.executable, MONITOR_DIR, '--starting-id', str(shard['start']), '--total-mint',
+            str(shard['end']), '--chain', chain, '--create-policy', 'false', *worker_args]
+        workers.append(subprocess.Popen(args, cwd=shard['dir']))
+
+    return all(worker.wait() == 0 for worker in workers)
+
+if __name__ == '__main__':
+    chain = 'testnet-magic'
+    starting_id = 1
+    shards = 2
+    new_policy = False
+    worker_args = []
+
+    for x in range(0,len(sys.argv)):
+        if sys.argv[x] == '--starting-id':
+            starting_id = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--total-mint':
+            total_mint = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--chain':
+            chain = sys.argv[x+1]
+        elif sys.argv[x] == '--shards':
+            shards = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--create-policy':
+            new_policy = sys.argv[x+1].lower() == 'true'
+        elif sys.argv[x] == '--mintable-time':
+            mintable_time = int(sys.argv[x+1].strip())
+        elif sys.argv[x] in ('--batch-size', '--pipeline', '--refund-time', '--refund-window', '--archive-file',
+            '--warm-up', '--max-quantity', '--price-tolerance'):
+            worker_args += sys.argv[x:x+2]
+
+    assert chain in VALID_CHAINS, f'Invalid argument for chain: {chain}'
+    assert total_mint >= starting_id, f'Invalid argument for total mint: {total_mint}'
+    assert 1 <= shards <= total_mint - starting_id + 1, f'Invalid argument for shards: {shards}'
+
+    # The policy is shared, so it is created once before any shard starts
+    if new_policy and not create_policy(mintable_time, chain):
+        print(f'Error creating the policy in {POLICY_DIR}...')
+        sys.exit(1)
+
+    allocation = get_allocation(starting_id, total_mint, shards, chain)
+
+    if allocation and run_shards(allocation, chain, worker_args):
+        print('Every shard has ended!')
+    else:
+        sys.exit(1)
@@ -0,0 +1,170 @@
+from generate_metadata import generate_metadata
+from compact_metadata import compact_metadata, predict_mint_transaction
+from policy import get_policy_id, get_policy_script_size
+from fees import calculate_min_utxo
+from metrics import QUEUE_DEPTH, STAGE_SECONDS, TEMPLATES, timed
+import threading
+
+# NFT IDs prepared ahead of the next one to mint
+TEMPLATE_AHEAD = 50
+
+"""
+The parts of a mint transaction that do not depend on the payment.
+
+Only the input, the payer address and the TTL are left to bind once a payment
+arrives, so no metadata, policy or protocol lookups happen on the critical path.
+"""
+class MintTemplate:
+    def __init__(self, id, metadata, policy_id, token_name, output, fee):
+        self.id = id
+        self.metadata = metadata
+        self.policy_id = policy_id
+        self.token_name = token_name
+        self.output = output
+        self.fee = fee
+
+"""
+Prepares the mint template of an NFT.
+
+The fee is sized for the largest payer address, input index, TTL and Lovelace values,
+so it covers any payment the template is bound to.
+
+Args:
+    id: The ID of the NFT.
+    address: The minting address which receives the change.
+
+Returns:
+    The mint template or False if the template could not be prepared.
+"""
+@timed(STAGE_SECONDS, stage='template')
+def prepare_template(id, address):
+    metadata = generate_metadata(id)
+    policy_id = get_policy_id()
+    script_size = get_policy_script_size()
+
+    if not metadata or not policy_id or script_size is None:
+        print(f'Error preparing the template of NFT {id}...')
+        return False
+
+    token_name = list(metadata['721'][policy_id].keys())[0].encode('utf-8').hex()
+    output = calculate_min_utxo({policy_id: {token_name: 1}})
+
+    if not output:
+        print('Error when calculating minimum UTxO...')
+        return False
+
+    try:
+        metadata = compact_metadata(metadata)
+        _, fee = predict_mint_transaction(metadata, [[token_name]], address, script_size)
+    except ValueError as e:
+        print(e)
+        return False
+
+    if not fee:
+        print('Error loading protocol parameters...')
+        return False
+
+    return MintTemplate(id, metadata, policy_id, token_name, output, fee)
+
+"""
+Keeps the templates of the next NFT IDs ready, preparing them in a background thread.
+
+The thread only runs while the prepared templates fall short of the next ahead IDs,
+so it works in the idle time before a drop and catches up between payments.
+"""
+class TemplateCache:
+    def __init__(self, address, total_mint, ahead=TEMPLATE_AHEAD):
+        self.address = address
+        self.total_mint = total_mint
+        self.ahead = ahead
+        self.lock = threading.Lock()
+        self.templates = dict()
+        self.taken = set()
+        self.next_id = None
+        self.wanted = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    """
+    Moves the warm-up window to start at the next NFT ID to mint.
+
+    Args:
+        next_id: The next NFT ID to mint.
+    """
+    def warm(self, next_id):
+        with self.lock:
+            self.next_id = next_id
+
+        self.wanted.set()
+
+    """
+    Takes the template of an NFT, preparing it on the spot when it is not ready.
+
+    Args:
+        id: The ID of the NFT.
+
+    Returns:
+        The mint template or False if the template could not be prepared.
+    """
+    def take(self, id):
+        with self.lock:
+            template = self.templates.pop(id, None)
+            self.taken.add(id)
+
+        TEMPLATES.inc(result='hit' if template else 'miss')
+        return template or prepare_template(id, self.address)
+
+    """
+    Gets the next ID of the window without a template.
+
+    Returns:
+        The NFT ID or None if the window is fully prepared.
+    """
+    def missing(self):
+        with self.lock:
+            if self.next_id is None:
+                return None
+
+            QUEUE_DEPTH.set(len(self.templates), queue='templates')
+
+            for id in range(self.next_id, min(self.next_id+self.ahead, self.total_mint+1)):
+                if id not in self.templates and id not in self.taken:
+                    return id
+
+        return None
+
+    """
+    Starts preparing templates in a background thread.
+    """
+    def start(self):
+        def run():
+            while not self.stopped.is_set():
+                self.wanted.wait()
+                self.wanted.clear()
+                id = self.missing()
+
+                while id is not None and not self.stopped.is_set():
+                    template = prepare_template(id, self.address)
+
+                    if not template:
+                        break
+
+                    with self.lock:
+                        # The ID may have been taken while its template was prepared
+                        if id not in self.taken:
+                            self.templates[id] = template
+
+                    id = self.missing()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+
+    """
+    Stops the background thread.
+    """
+    def stop(self):
+        self.stopped.set()
+        self.wanted.set()
+
+        if self.thread:
+            self.thread.join()
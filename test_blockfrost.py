@@ -0,0 +1,63 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from metrics import BLOCKFROST_RETRIES
+import blockfrost
+import threading
+import pytest
+import json
+import time
+
+# Longer than the jittered backoff of a first retry, so only Retry-After explains the delay
+RETRY_AFTER = 2
+
+"""
+Blockfrost stand-in answering the first request with 429 and Retry-After, then 200.
+"""
+class RateLimitedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.times.append(time.monotonic())
+
+        if len(self.server.times) == 1:
+            self.send_response(429)
+            self.send_header('Retry-After', str(RETRY_AFTER))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = json.dumps({'ipfs_hash': 'QmTest'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+"""
+Starts the rate limited server and points the shared client at it.
+"""
+@pytest.fixture
+def server(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RateLimitedHandler)
+    server.times = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setenv('BLOCKFROST_API_URL', f'http://127.0.0.1:{server.server_port}/')
+    monkeypatch.setattr(blockfrost, 'client', None)
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+"""
+Checks that a 429 response is retried once, after the delay its Retry-After asks for.
+"""
+def test_retry_after(server):
+    retries = BLOCKFROST_RETRIES.values.get(('ipfs/pin/list',), 0)
+
+    assert blockfrost.get_client().get('ipfs/pin/list') == {'ipfs_hash': 'QmTest'}
+    assert len(server.times) == 2
+    assert BLOCKFROST_RETRIES.values[('ipfs/pin/list',)] == retries + 1
+    assert server.times[1] - server.times[0] >= RETRY_AFTER
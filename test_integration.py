@@ -1,48 +1,115 @@
-from monitor_mint_transactions import TEST_ADDRESSES, FEE, get_address
+from monitor_mint_transactions import TEST_ADDRESSES, FEE, get_address, get_tx_info
+from build_and_sign_transaction import SLOT_MARGIN, submit_transaction_bytes
+from transaction import build_transaction_body, sign_transaction_body
+from fees import calculate_min_utxo, calculate_transaction_fee
 from helpers import get_slot_number
-import subprocess
+from mempool import Mempool
+from utxo import parse_utxos
+import time
+import sys
 
 # Add automatic test address generation
 
-# Update manually
-TX_HASHES = [
-    '7bc3bd843e9b3a1a5caba99c04819e5dec18778053754fc57b2fa64ec64a65a3',
-    '7b7143584c310fa3e70b39ec9761ed3f8ffc79010d818ab86075de8a24b6573f',
-    '7bc3bd843e9b3a1a5caba99c04819e5dec18778053754fc57b2fa64ec64a65a3']
-TX_IXS = [1, 0, 0]
-FUNDS = [780000000, 109825215, 109825215]
+RETRY_DELAY = 20
+ATTEMPTS = 30
 
-def submit_mint_request(index):
+"""
+Sends a mint request from a test address.
+
+The largest spendable UTxO is used, including the change of earlier requests that
+are not confirmed yet, so consecutive requests do not wait for a block.
+
+Args:
+    index: The index of the test address.
+    utxos: The confirmed UTxOs of the test address, keyed by tx_hash#tx_ix.
+    slot_number: The current slot number.
+    mempool: The pending transactions of the test addresses.
+
+Returns:
+    The transaction ID or False if no UTxO could pay for the request or the submit failed.
+"""
+def submit_mint_request(index, utxos, slot_number, mempool):
     address = get_address()
-    args = ['cardano-cli', 'transaction', 'build-raw', '--tx-in', f'{TX_HASHES[index]}#{TX_IXS[index]}',
-        '--tx-out', f'{address}+{FEE}', '--tx-out', f'{TEST_ADDRESSES[index]}+{FUNDS[index]-int(FEE)}',
-        '--ttl', '0', '--fee', '0', '--out-file', 'tx.raw']
-    subprocess.run(args)
-
-    args = ['cardano-cli', 'transaction', 'calculate-min-fee', '--tx-body-file', 
-        'tx.raw', '--tx-in-count', '1', '--tx-out-count', '2', '--witness-count', 
-        '1', '--byron-witness-count', '0', '--testnet-magic', '1097911063',
-        '--protocol-params-file', 'protocol.json']
-    
-    fee = int(subprocess.run(args, capture_output=True).stdout.decode().split()[0])
-
-    args = ['cardano-cli', 'transaction', 'build-raw', '--tx-in', f'{TX_HASHES[index]}#{TX_IXS[index]}',
-        '--tx-out', f'{address}+{FEE}', '--tx-out', f'{TEST_ADDRESSES[index]}+{FUNDS[index]-int(FEE)-fee}',
-        '--ttl', str(get_slot_number()+10000), '--fee', str(fee), '--out-file', 'tx.raw']
-    
-    subprocess.run(args)
-
-    args = ['cardano-cli', 'transaction', 'sign', '--tx-body-file', 
-        'tx.raw', '--signing-key-file', f'payment{index+1}.skey',
-        '--testnet-magic', '1097911063', '--out-file', 'tx.signed']
-    
-    subprocess.run(args)
-
-    args = ['cardano-cli', 'transaction', 'submit', '--tx-file', 
-        'tx.signed', '--testnet-magic', '1097911063']
-    
-    subprocess.run(args)
-
-submit_mint_request(0)
-submit_mint_request(1)
-submit_mint_request(2)
\ No newline at end of file
+    payer = TEST_ADDRESSES[index]
+    ttl = slot_number+SLOT_MARGIN
+    funds = [utxo for utxo in mempool.available(utxos, payer) if not utxo.assets]
+
+    if not funds:
+        return False
+
+    utxo = max(funds, key=lambda utxo: utxo.lovelace)
+    fee = calculate_transaction_fee([utxo.tx_ix], [(address, int(FEE)),
+        (payer, utxo.lovelace-int(FEE))], ttl)
+
+    if utxo.lovelace-int(FEE)-fee < calculate_min_utxo():
+        return False
+
+    body = build_transaction_body([(utxo.tx_hash, utxo.tx_ix)], [(address, int(FEE)),
+        (payer, utxo.lovelace-int(FEE)-fee)], fee, ttl)
+    tx = sign_transaction_body(body, [f'payment{index+1}.skey'])
+
+    if not submit_transaction_bytes(tx):
+        return False
+
+    return mempool.add(body)
+
+"""
+Sends mint requests from every test address, chaining each request on the change of
+the previous one.
+
+Requests whose transaction expires before it is confirmed are sent again.
+
+Args:
+    count: The number of requests per test address.
+    mempool: The pending transactions of the test addresses.
+
+Returns:
+    A boolean indicating whether every request was submitted.
+"""
+def submit_mint_requests(count, mempool):
+    for index, payer in enumerate(TEST_ADDRESSES):
+        sent = set()
+        remaining = count
+        attempts = 0
+
+        while remaining:
+            try:
+                utxos = parse_utxos(get_tx_info(payer) or '{}')
+            except ValueError:
+                utxos = dict()
+
+            slot_number = get_slot_number()
+
+            for tx_id in mempool.update(utxos, slot_number):
+                if tx_id in sent:
+                    sent.discard(tx_id)
+                    remaining += 1
+
+            tx_id = submit_mint_request(index, utxos, slot_number, mempool)
+
+            if tx_id:
+                sent.add(tx_id)
+                remaining -= 1
+                attempts = 0
+                continue
+
+            attempts += 1
+
+            if attempts >= ATTEMPTS:
+                print(f'Error sending mint requests from {payer}...')
+                return False
+
+            time.sleep(RETRY_DELAY)
+
+    return True
+
+if __name__ == '__main__':
+    count = 1
+
+    for x in range(0,len(sys.argv)):
+        if sys.argv[x] == '--count':
+            count = int(sys.argv[x+1].strip())
+
+    assert count >= 1, f'Invalid argument for count: {count}'
+
+    submit_mint_requests(count, Mempool())
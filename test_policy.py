@@ -0,0 +1,41 @@
+from policy import build_policy_script, get_key_hash, get_script_policy_id
+import pytest
+
+# Public key of the first RFC 8032 test vector
+PUBLIC = 'd75a980182b10ab7d54bfed3c964073a0ee172f3daa62325af021a68f707511a'
+# Golden vectors captured with pycardano 0.11.1, (script, policy ID)
+KEY_HASH = '35dedd2982a03cf39e7dce03c839994ffdec2ec6b04f1cf2d40e61a3'
+POLICY_VECTORS = [
+    ({'type': 'sig', 'keyHash': KEY_HASH}, 'b5c02fe2b3cd5339561bb9b9fbb2b88295bbd1848116d53d99ccfe0c'),
+    ({'type': 'all', 'scripts': [{'type': 'before', 'slot': 40460000}, {'type': 'sig', 'keyHash': KEY_HASH}]},
+        'b37732b87af48df99c38d0157f8d9b9fec679d67b7e3b328eb3cd11c'),
+    ({'type': 'any', 'scripts': [{'type': 'sig', 'keyHash': KEY_HASH}, {'type': 'after', 'slot': 1000},
+        {'type': 'atLeast', 'required': 1, 'scripts': [{'type': 'sig', 'keyHash': KEY_HASH}]}]},
+        '7e7afeca48a892cd0efd998e1763cbac73e421f62dba800e1d1bca1f')
+]
+
+"""
+Checks the key hash of a verification key against the golden vector.
+"""
+def test_key_hash():
+    assert get_key_hash(bytes.fromhex(PUBLIC)) == KEY_HASH
+
+"""
+Checks policy IDs against the golden vectors.
+"""
+@pytest.mark.parametrize('script, policy_id', POLICY_VECTORS)
+def test_script_policy_id(script, policy_id):
+    assert get_script_policy_id(script) == policy_id
+
+"""
+Checks that the policy the minter creates hashes like the time-locked golden vector.
+"""
+def test_build_policy_script():
+    assert get_script_policy_id(build_policy_script(KEY_HASH, 40460000)) == POLICY_VECTORS[1][1]
+
+"""
+Checks that unsupported script types are refused.
+"""
+def test_script_policy_id_unsupported():
+    with pytest.raises(ValueError):
+        get_script_policy_id({'type': 'plutus'})
@@ -0,0 +1,170 @@
+from transaction import (build_transaction_body, decode_transaction_body, get_transaction_fee, get_transaction_id,
+    load_signing_key, sign_transaction_body)
+from cbor import Raw, dumps, loads
+import build_and_sign_transaction
+import bech32
+import pytest
+import json
+
+# RFC 8032 section 7.1 test vectors, (secret key, public key, message, signature)
+RFC8032_VECTORS = [
+    ('9d61b19deffd5a60ba844af492ec2cc44449c5697b326919703bac031cae7f60',
+        'd75a980182b10ab7d54bfed3c964073a0ee172f3daa62325af021a68f707511a',
+        '',
+        'e5564300c360ac729086e2cc806e828a84877f1eb8e5d974d873e065224901555fb8821590a33bacc61e39701cf9b46bd25bf5f0595bbe24655141438e7a100b'),
+    ('4ccd089b28ff96da9db6c346ec114e0f5b8a319f35aba624da8cf6ed4fb8a6fb',
+        '3d4017c3e843895a92b70aa74d1b7ebc9c982ccf2ec4968cc0cd55f12af4660c',
+        '72',
+        '92a009a9f0d4cab8720e820b5f642540a2b27b5416503f8fb3762223ebdb69da085ac1e43e15996e458f3613d0f11d8c387b2eaeb4302aeeb00d291612bb0c00'),
+    ('c5aa8df43f9f837bedb7442f31dcb7b166d38535076f094b85ce3a2e0b4458f7',
+        'fc51cd8e6218a1a38da47ed00230f0580816ed13ba3303ac5deb911548908025',
+        'af82',
+        '6291d657deec24024827e69c3abe01a30ce548a284743a445e3680d7db5ac3ac18ff9b538d16f290ae67f760984dc6594a7c15e9716ed28dc027beceea1ec40a')
+]
+# RFC 8949 appendix A examples, (value, encoding)
+CBOR_VECTORS = [
+    (0, '00'), (23, '17'), (24, '1818'), (1000000, '1a000f4240'), (1000000000000, '1b000000e8d4a51000'),
+    (-1, '20'), (-1000, '3903e7'), (b'', '40'), ('IETF', '6449455446'), (True, 'f5'), (None, 'f6'),
+    ([1, [2, 3], [4, 5]], '8301820203820405'), ({1: 2, 3: 4}, 'a201020304')
+]
+ADDRESSES = [
+    'addr_test1vrpffsusclp4vfkp902he90zl2rha4lyjd8c94wcj2uz9jqydpd5f',
+    'addr_test1vpv9z3x4eg7mn50dtdg5z9w369qwnmtpsz8km327vn49cqs4qmpej']
+INPUTS = [
+    ('f1b2c3d4e5f60718293a4b5c6d7e8f90a1b2c3d4e5f60718293a4b5c6d7e8f90', 1),
+    ('0a1b2c3d4e5f60718293a4b5c6d7e8f90a1b2c3d4e5f60718293a4b5c6d7e8f9', 0)]
+# Golden vectors captured with pycardano 0.11.1 for INPUTS, 10 ADA to the first address,
+# the change to the second, a fee of 174257 and a TTL of 40460000: the body, its
+# transaction ID and the transaction signed with the first RFC 8032 key
+BODY = ('a400828258200a1b2c3d4e5f60718293a4b5c6d7e8f90a1b2c3d4e5f60718293a4b5c6d7e8f900825820f1b2c3d4e5f6'
+    '0718293a4b5c6d7e8f90a1b2c3d4e5f60718293a4b5c6d7e8f9001018282581d60c294c390c7c35626c12bd57c95e2fa877e'
+    'd7e4934f82d5d892b822c81a0098968082581d60585144d5ca3db9d1ed5b514115d1d140e9ed61808f6dc55e64ea5c021a05'
+    'f5e100021a0002a8b1031a02695ee0')
+TX_ID = '43fe9c1d5d0d402dbe156b0c50c8527775b96a83d93cfa978f1683e0fd4f9390'
+SIGNED_TX = ('84' + BODY + 'a10081825820d75a980182b10ab7d54bfed3c964073a0ee172f3daa62325af021a68f707511a5840'
+    '2a4b7543da312dd15e946d00692c4ffdf8408dc9a7b84d0f21e25d64ce6da407cd876db565dab7b0153e08b8684c1be243ea'
+    '0716bb26e713a1379c8aab7db606f5f6')
+POLICY_ID = 'b37732b87af48df99c38d0157f8d9b9fec679d67b7e3b328eb3cd11c'
+
+"""
+Writes a signing key in the cardano-cli key envelope.
+
+Args:
+    path: The filepath of the .skey file.
+    secret: The 32-byte private key seed in hex.
+
+Returns:
+    The filepath of the .skey file.
+"""
+def write_signing_key(path, secret):
+    with open(path, 'w') as file:
+        json.dump({'type': 'PaymentSigningKeyShelley_ed25519', 'description': 'Payment Signing Key',
+            'cborHex': '5820' + secret}, file)
+
+    return str(path)
+
+"""
+Checks loaded signing keys against the RFC 8032 test vectors.
+"""
+@pytest.mark.parametrize('secret, public, message, signature', RFC8032_VECTORS)
+def test_signing_key_rfc8032(tmp_path, secret, public, message, signature):
+    private_key, public_key = load_signing_key(write_signing_key(tmp_path / 'payment.skey', secret))
+
+    assert public_key.hex() == public
+    assert private_key.sign(bytes.fromhex(message)).hex() == signature
+
+"""
+Checks encoding and decoding against the RFC 8949 examples.
+"""
+@pytest.mark.parametrize('value, encoding', CBOR_VECTORS)
+def test_cbor_rfc8949(value, encoding):
+    assert dumps(value).hex() == encoding
+    assert loads(bytes.fromhex(encoding)) == value
+
+"""
+Checks that raw CBOR is written unchanged.
+"""
+def test_cbor_raw():
+    assert dumps([Raw(bytes.fromhex('a201020304')), 1]).hex() == '82a20102030401'
+
+"""
+Checks that addresses survive a bech32 round-trip and that corrupted ones are refused.
+"""
+@pytest.mark.parametrize('address', ADDRESSES)
+def test_bech32_round_trip(address):
+    hrp, data = bech32.decode(address)
+
+    assert hrp == 'addr_test'
+    assert len(data) == 29
+    assert bech32.encode(hrp, data) == address
+
+    corrupted = address[:-1] + ('q' if address[-1] != 'q' else 'p')
+
+    with pytest.raises(ValueError):
+        bech32.decode(corrupted)
+
+"""
+Checks decoding against the BIP 173 test vectors.
+"""
+def test_bech32_bip173():
+    assert bech32.decode('A12UEL5L') == ('a', b'')
+    assert bech32.decode('a12uel5l') == ('a', b'')
+
+    with pytest.raises(ValueError):
+        bech32.decode('a12uel5m')
+
+"""
+Checks the transaction body and ID against the golden vectors.
+"""
+def test_build_transaction_body():
+    body = build_transaction_body(INPUTS, [(ADDRESSES[0], 10000000), (ADDRESSES[1], 100000000)], 174257, 40460000)
+
+    assert body.hex() == BODY
+    assert get_transaction_id(body) == TX_ID
+
+"""
+Checks the signed transaction, [body, {0: [[vkey, signature]]}, true, null], against
+the golden vector.
+"""
+def test_sign_transaction_body(tmp_path):
+    skey_path = write_signing_key(tmp_path / 'payment.skey', RFC8032_VECTORS[0][0])
+
+    body = bytes.fromhex(BODY)
+    tx = sign_transaction_body(body, (skey_path,))
+
+    assert tx.hex() == SIGNED_TX
+    assert decode_transaction_body(tx)[0] == body
+    assert get_transaction_fee(tx) == 174257
+
+"""
+Stubs the policy and the metadata of a batch, each NFT carrying about 6.5 KB of metadata.
+
+Args:
+    monkeypatch: The pytest monkeypatch fixture.
+    script_size: The size of the policy script or None when only the policy ID is known.
+"""
+def stub_batch(monkeypatch, script_size):
+    monkeypatch.setattr(build_and_sign_transaction, 'get_policy_id', lambda: POLICY_ID)
+    monkeypatch.setattr(build_and_sign_transaction, 'get_policy_script_size', lambda: script_size)
+    monkeypatch.setattr(build_and_sign_transaction, 'generate_metadata',
+        lambda id: {'721': {POLICY_ID: {f'NFT{id}': {'name': f'NFT{id}', 'notes': ['x' * 64] * 100}}}})
+
+"""
+Checks that a batch refuses a policy known only by its ID, as its size cannot be predicted.
+"""
+def test_batch_without_policy_script(monkeypatch, capsys):
+    stub_batch(monkeypatch, None)
+
+    assert build_and_sign_transaction.build_batch_transaction([(INPUTS[0][0], 0, ADDRESSES[0], 1, 0)],
+        ADDRESSES[1], 1) is False
+    assert 'policy.script' in capsys.readouterr().out
+
+"""
+Checks that a first request too large for a single transaction is refused.
+"""
+def test_batch_oversized_request(monkeypatch, capsys):
+    stub_batch(monkeypatch, 40)
+
+    assert build_and_sign_transaction.build_batch_transaction([(INPUTS[0][0], 0, ADDRESSES[0], 3, 0)],
+        ADDRESSES[1], 1) is False
+    assert 'maximum transaction size' in capsys.readouterr().out
@@ -0,0 +1,187 @@
+from generate_metadata import TRAIT_PLAN_DIR
+import numpy as np
+import json
+import time
+import math
+import sys
+import os
+
+TRAITS_DIR = './traits'
+LAYERS_DIR = f'{TRAITS_DIR}/layers.json'
+# Rounds of resampling the duplicate combinations before giving up
+MAX_RESAMPLE_ROUNDS = 100
+
+"""
+A trait layer, such as the background or the eyes, with the weight of each trait.
+"""
+class Layer:
+    def __init__(self, name, traits, weights):
+        self.name = name
+        self.traits = traits
+        self.weights = np.asarray(weights, dtype=np.float64)
+
+"""
+Loads the trait layers in the order they are stacked.
+
+The file is a list of {"name": layer, "traits": {trait: weight}} objects.
+
+Args:
+    path: The filepath of the layers file.
+
+Returns:
+    The list of layers.
+
+Raises:
+    ValueError: Raised when a layer has no trait with a positive weight.
+"""
+def load_layers(path=LAYERS_DIR):
+    with open(path, 'r') as file:
+        layers = [Layer(layer['name'], list(layer['traits'].keys()), list(layer['traits'].values()))
+            for layer in json.load(file)]
+
+    for layer in layers:
+        if len(layer.traits) > np.iinfo(np.uint16).max or not (layer.weights > 0).any() or (layer.weights < 0).any():
+            raise ValueError(f'Invalid weights in layer {layer.name}')
+
+    return layers
+
+"""
+Gets a key per trait combination, equal keys meaning equal combinations.
+
+Combinations are numbered in a mixed radix of the layer sizes when they fit in 64 bits,
+otherwise the raw bytes of each combination are the key.
+
+Args:
+    traits: The trait indices, one row per NFT and one column per layer.
+    sizes: The number of traits of each layer.
+
+Returns:
+    The array of keys.
+"""
+def get_trait_keys(traits, sizes):
+    if math.prod(sizes) < 2**63:
+        radix = np.cumprod([1] + sizes[:-1], dtype=np.int64)
+        return traits.astype(np.int64) @ radix
+
+    traits = np.ascontiguousarray(traits)
+    return traits.view(np.dtype((np.void, traits.dtype.itemsize * traits.shape[1]))).ravel()
+
+"""
+Samples a unique trait combination for every NFT at once.
+
+Each layer is sampled for all NFTs in one call, then only the rows that repeat an
+earlier combination are sampled again.
+
+Args:
+    layers: The trait layers.
+    count: The number of NFTs.
+    rng: The NumPy random generator.
+
+Returns:
+    The trait indices, one row per NFT and one column per layer.
+
+Raises:
+    ValueError: Raised when the layers cannot give count unique combinations.
+"""
+def sample_traits(layers, count, rng):
+    sizes = [len(layer.traits) for layer in layers]
+    probabilities = [layer.weights / layer.weights.sum() for layer in layers]
+
+    if math.prod(int((p > 0).sum()) for p in probabilities) < count:
+        raise ValueError(f'The layers allow fewer than {count} unique combinations')
+
+    traits = np.empty((count, len(layers)), dtype=np.uint16)
+    rows = np.arange(count)
+
+    for _ in range(MAX_RESAMPLE_ROUNDS):
+        for x, p in enumerate(probabilities):
+            traits[rows, x] = rng.choice(sizes[x], size=len(rows), p=p)
+
+        _, first = np.unique(get_trait_keys(traits, sizes), return_index=True)
+        rows = np.setdiff1d(np.arange(count), first, assume_unique=True)
+
+        if not len(rows):
+            return traits
+
+    raise ValueError(f'{len(rows)} combinations were still duplicates after {MAX_RESAMPLE_ROUNDS} rounds')
+
+"""
+Computes the statistical rarity of every NFT, the sum of the inverse frequencies of its
+traits in the collection.
+
+Args:
+    traits: The trait indices, one row per NFT and one column per layer.
+    layers: The trait layers.
+
+Returns:
+    A (scores, ranks) tuple of arrays, rank 1 being the rarest NFT.
+"""
+def compute_rarity(traits, layers):
+    count = len(traits)
+    scores = np.zeros(count)
+
+    for x, layer in enumerate(layers):
+        frequencies = np.bincount(traits[:, x], minlength=len(layer.traits)) / count
+        scores += 1 / frequencies[traits[:, x]]
+
+    ranks = np.empty(count, dtype=np.int64)
+    ranks[np.argsort(-scores, kind='stable')] = np.arange(1, count+1)
+    return scores, ranks
+
+"""
+Plans the traits of a collection and writes them to the trait plan.
+
+generate_bulk_metadata adds the planned traits to the metadata as CIP-25 attributes,
+with img/{id}.png as the image rendered from them.
+
+Args:
+    start_id: The ID of the first NFT.
+    end_id: The ID of the last NFT.
+    seed: The seed of the sampling, fresh entropy is used when None.
+    path: The filepath of the layers file.
+
+Returns:
+    The number of NFTs planned.
+
+Raises:
+    ValueError: Raised when the layers cannot give a unique combination to every NFT.
+"""
+def plan_collection(start_id, end_id, seed=None, path=LAYERS_DIR):
+    layers = load_layers(path)
+    count = end_id - start_id + 1
+    traits = sample_traits(layers, count, np.random.default_rng(seed))
+    scores, ranks = compute_rarity(traits, layers)
+    names = [np.array(layer.traits, dtype=object) for layer in layers]
+    columns = [names[x][traits[:, x]] for x in range(len(layers))]
+    plan = dict()
+
+    for x in range(count):
+        plan[start_id+x] = {
+            'attributes': {layer.name: column[x] for layer, column in zip(layers, columns)},
+            'rarity_score': round(float(scores[x]), 4),
+            'rarity_rank': int(ranks[x])
+        }
+
+    with open(f'{TRAIT_PLAN_DIR}.tmp', 'w') as file:
+        json.dump(plan, file)
+
+    os.replace(f'{TRAIT_PLAN_DIR}.tmp', TRAIT_PLAN_DIR)
+    return count
+
+if __name__ == '__main__':
+    starting_id = 1
+    seed = None
+
+    for x in range(0,len(sys.argv)):
+        if sys.argv[x] == '--starting-id':
+            starting_id = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--total-mint':
+            total_mint = int(sys.argv[x+1].strip())
+        elif sys.argv[x] == '--seed':
+            seed = int(sys.argv[x+1].strip())
+
+    assert total_mint >= starting_id, f'Invalid argument for total mint: {total_mint}'
+
+    start = time.perf_counter()
+    count = plan_collection(starting_id, total_mint, seed)
+    print(f'Planned the traits of {count} NFTs in {time.perf_counter() - start:.2f}s.')
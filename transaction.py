@@ -0,0 +1,184 @@
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.serialization import Encoding, NoEncryption, PrivateFormat, PublicFormat
+from cbor import Raw, decode_item, dumps
+import threading
+import hashlib
+import bech32
+import json
+import os
+
+PAYMENT_SKEY_DIR = './payment.skey'
+TX_TYPE = 'Tx AlonzoEra'
+
+signing_keys = dict()
+signing_keys_lock = threading.Lock()
+
+"""
+Loads a signing key from a cardano-cli key envelope.
+
+Keys are cached after the first load.
+
+Args:
+    path: The filepath of the .skey file.
+
+Returns:
+    The Ed25519PrivateKey and the 32-byte public key.
+
+Raises:
+    ValueError: Raised when the file is not a payment signing key.
+"""
+def load_signing_key(path=PAYMENT_SKEY_DIR):
+    with signing_keys_lock:
+        if path not in signing_keys:
+            with open(path, 'r') as file:
+                envelope = json.load(file)
+
+            key = bytes.fromhex(envelope['cborHex'])
+
+            if key[:2] != b'\x58\x20':
+                raise ValueError(f'Unsupported signing key in {path}')
+
+            private_key = Ed25519PrivateKey.from_private_bytes(key[2:])
+            signing_keys[path] = (private_key, private_key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw))
+
+        return signing_keys[path]
+
+"""
+Generates a key pair and writes it in the cardano-cli address key-gen format.
+
+The signing key is created readable by the owner only and an existing one is never
+overwritten.
+
+Args:
+    skey_path: The filepath of the .skey file.
+    vkey_path: The filepath of the .vkey file.
+
+Returns:
+    The 32-byte public key.
+
+Raises:
+    FileExistsError: Raised when the signing key already exists.
+"""
+def generate_signing_key(skey_path, vkey_path):
+    private_key = Ed25519PrivateKey.generate()
+    seed = private_key.private_bytes(Encoding.Raw, PrivateFormat.Raw, NoEncryption())
+    public = private_key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+    descriptor = os.open(skey_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+
+    with os.fdopen(descriptor, 'w') as file:
+        json.dump({'type': 'PaymentSigningKeyShelley_ed25519', 'description': 'Payment Signing Key',
+            'cborHex': '5820' + seed.hex()}, file, indent=4)
+
+    with open(vkey_path, 'w') as file:
+        json.dump({'type': 'PaymentVerificationKeyShelley_ed25519', 'description': 'Payment Verification Key',
+            'cborHex': '5820' + public.hex()}, file, indent=4)
+
+    with signing_keys_lock:
+        signing_keys[skey_path] = (private_key, public)
+
+    return public
+
+"""
+Builds the CBOR body of a Lovelace-only Alonzo transaction, as cardano-cli build-raw does.
+
+Args:
+    inputs: A list of (tx_hash, tx_ix) tuples.
+    outputs: A list of (address, lovelace) tuples.
+    fee: The transaction fee in Lovelace.
+    ttl: The slot after which the transaction is invalid.
+
+Returns:
+    The encoded transaction body.
+"""
+def build_transaction_body(inputs, outputs, fee, ttl):
+    return dumps({
+        0: [[bytes.fromhex(tx_hash), tx_ix] for tx_hash, tx_ix in sorted(inputs)],
+        1: [[bech32.decode(address)[1], lovelace] for address, lovelace in outputs],
+        2: fee,
+        3: ttl
+    })
+
+"""
+Gets the ID of a transaction.
+
+Args:
+    body: The encoded transaction body.
+
+Returns:
+    The transaction ID in hex.
+"""
+def get_transaction_id(body):
+    return hashlib.blake2b(body, digest_size=32).hexdigest()
+
+"""
+Signs a transaction body with one or more signing keys.
+
+Args:
+    body: The encoded transaction body.
+    key_paths: The filepaths of the .skey files.
+
+Returns:
+    The encoded signed transaction.
+"""
+def sign_transaction_body(body, key_paths=(PAYMENT_SKEY_DIR,)):
+    tx_hash = hashlib.blake2b(body, digest_size=32).digest()
+    witnesses = []
+
+    for path in key_paths:
+        private_key, public = load_signing_key(path)
+        witnesses.append([public, private_key.sign(tx_hash)])
+
+    return dumps([Raw(body), {0: witnesses}, True, None])
+
+"""
+Decodes the body of a signed transaction, skipping the witnesses and metadata.
+
+Args:
+    tx: The encoded signed transaction.
+
+Returns:
+    The encoded body, whose hash is the transaction ID, and the decoded body.
+
+Raises:
+    ValueError: Raised when the data is not a valid transaction.
+"""
+def decode_transaction_body(tx):
+    # The body directly follows the one byte head of the transaction array
+    fields, end = decode_item(tx, 1)
+
+    if not isinstance(fields, dict):
+        raise ValueError('Invalid transaction body')
+
+    return tx[1:end], fields
+
+"""
+Gets the fee of a signed transaction.
+
+Args:
+    tx: The encoded signed transaction.
+
+Returns:
+    The fee in Lovelace.
+
+Raises:
+    ValueError: Raised when the data is not a valid transaction.
+"""
+def get_transaction_fee(tx):
+    _, fields = decode_transaction_body(tx)
+
+    if 2 not in fields:
+        raise ValueError('Transaction body without a fee')
+
+    return fields[2]
+
+"""
+Wraps a signed transaction in the text envelope cardano-cli reads.
+
+Args:
+    tx: The encoded signed transaction.
+
+Returns:
+    The envelope in JSON format.
+"""
+def get_transaction_envelope(tx):
+    return json.dumps({'type': TX_TYPE, 'description': '', 'cborHex': tx.hex()})
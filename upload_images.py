@@ -0,0 +1,90 @@
+from helpers import add_image_to_ipfs, pin_image_to_ipfs
+from image_cache import IMG_DIR, get_image_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import sys
+import os
+
+UPLOAD_WORKERS = 4
+
+"""
+Uploads and pins a single image to IPFS.
+
+Transient Blockfrost errors are retried by the client.
+
+Args:
+    image: The image name in the image directory.
+
+Returns:
+    The IPFS hash of the image or False if it could not be uploaded.
+"""
+def upload_image(image):
+    try:
+        with open(f'{IMG_DIR}/{image}', 'rb') as file:
+            add_response = add_image_to_ipfs(file)
+    except OSError as e:
+        print(f'Error reading {image}: {e}')
+        return False
+
+    if 'Hash' not in add_response:
+        print(f'Error uploading {image}: {add_response.get("error")}')
+        return False
+
+    pin_response = pin_image_to_ipfs(add_response['Hash'])
+
+    if 'error' in pin_response:
+        print(f'Error pinning {image}: {pin_response["error"]}')
+        return False
+
+    return add_response['Hash']
+
+"""
+Uploads and pins every image of the image directory that is missing from hashes.json.
+
+Uploaded hashes are added to the image hash cache, which flushes them to hashes.json
+in batches, so an interrupted run resumes with the images that are still missing.
+
+Args:
+    workers: The number of concurrent uploads.
+
+Returns:
+    A boolean indicating whether every image has an IPFS hash.
+"""
+def upload_images(workers=UPLOAD_WORKERS):
+    image_cache = get_image_cache()
+    images = sorted(os.listdir(IMG_DIR))
+    missing = [image for image in images if image_cache.get(image) is None]
+    uploaded = 0
+    failed = 0
+
+    print(f'{len(images) - len(missing)} images already uploaded, {len(missing)} missing...')
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(upload_image, image): image for image in missing}
+
+        for future in as_completed(futures):
+            hash = future.result()
+
+            if hash:
+                image_cache.put(futures[future], hash)
+                uploaded += 1
+            else:
+                failed += 1
+
+            print(f'Uploaded {uploaded}/{len(missing)} images ({failed} failed)...')
+
+    image_cache.flush()
+    return failed == 0
+
+if __name__ == '__main__':
+    workers = UPLOAD_WORKERS
+
+    for x in range(0,len(sys.argv)):
+        if sys.argv[x] == '--workers':
+            workers = int(sys.argv[x+1].strip())
+
+    assert workers >= 1, f'Invalid argument for workers: {workers}'
+
+    if upload_images(workers):
+        print('Every image is uploaded and pinned.')
+    else:
+        print('Some images could not be uploaded, run again to retry them.')
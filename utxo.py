@@ -0,0 +1,155 @@
+import json
+
+"""
+A single unspent transaction output.
+"""
+class UTxO:
+    __slots__ = ('tx_hash', 'tx_ix', 'address', 'lovelace', 'assets')
+
+    def __init__(self, tx_hash, tx_ix, address, lovelace, assets):
+        self.tx_hash = tx_hash
+        self.tx_ix = tx_ix
+        self.address = address
+        self.lovelace = lovelace
+        self.assets = assets
+
+    """
+    Gets the UTxO in tx_hash#tx_ix format.
+    """
+    @property
+    def key(self):
+        return f'{self.tx_hash}#{self.tx_ix}'
+
+"""
+Parses the JSON output of cardano-cli query utxo --out-file.
+
+Args:
+    utxo_json: The JSON output in string format.
+
+Returns:
+    A dict of the UTxOs keyed by tx_hash#tx_ix.
+
+Raises:
+    ValueError: Raised when the utxo_json is incorrectly formatted.
+"""
+def parse_utxos(utxo_json):
+    utxos = dict()
+
+    try:
+        for key, entry in json.loads(utxo_json).items():
+            tx_hash, tx_ix = key.split('#')
+            value = dict(entry['value'])
+            lovelace = int(value.pop('lovelace'))
+            utxos[key] = UTxO(tx_hash, int(tx_ix), entry['address'], lovelace, value)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f'Invalid UTxO format: {e}')
+
+    return utxos
+
+"""
+Removes a UTxO from a secondary index, dropping empty buckets.
+
+Args:
+    index: The index mapping a value to a dict of UTxOs.
+    value: The indexed value of the UTxO.
+    key: The UTxO in tx_hash#tx_ix format.
+"""
+def remove_from_index(index, value, key):
+    bucket = index[value]
+    del bucket[key]
+
+    if not bucket:
+        del index[value]
+
+"""
+Indexes the UTxOs of an address by lovelace amount.
+
+Every update is diffed against the previous poll so only new UTxOs are indexed. New
+UTxOs holding exactly the watched amount, or an amount the accepts check passes, are
+queued as pending requests until they are handled or spent.
+"""
+class UTxOIndex:
+    def __init__(self, amount=None, accepts=None):
+        self.amount = amount
+        self.accepts = accepts
+        self.utxos = dict()
+        self.by_amount = dict()
+        self.pending = dict()
+
+    """
+    Updates the index with the result of a new poll.
+
+    Args:
+        utxos: A dict of the UTxOs keyed by tx_hash#tx_ix, as returned by parse_utxos.
+
+    Returns:
+        The lists of added and removed UTxOs.
+    """
+    def update(self, utxos):
+        removed = [self.utxos[key] for key in self.utxos.keys() - utxos.keys()]
+        added = [utxo for key, utxo in utxos.items() if key not in self.utxos]
+
+        for utxo in removed:
+            del self.utxos[utxo.key]
+            self.pending.pop(utxo.key, None)
+            remove_from_index(self.by_amount, utxo.lovelace, utxo.key)
+
+        for utxo in added:
+            self.utxos[utxo.key] = utxo
+            self.by_amount.setdefault(utxo.lovelace, dict())[utxo.key] = utxo
+
+            if utxo.lovelace == self.amount or (self.accepts and self.accepts(utxo.lovelace)):
+                self.pending[utxo.key] = utxo
+
+        return added, removed
+
+    """
+    Gets the UTxOs holding the given lovelace amount.
+
+    Args:
+        lovelace: The amount in Lovelace.
+
+    Returns:
+        The list of UTxOs in the order they were first seen.
+    """
+    def with_amount(self, lovelace):
+        return list(self.by_amount.get(lovelace, dict()).values())
+
+    """
+    Gets the pending requests in the order they were first seen.
+
+    Args:
+        limit: The maximum number of UTxOs to return.
+
+    Returns:
+        The list of pending UTxOs.
+    """
+    def next_pending(self, limit=None):
+        pending = []
+
+        for utxo in self.pending.values():
+            if limit is not None and len(pending) >= limit:
+                break
+
+            pending.append(utxo)
+
+        return pending
+
+    """
+    Removes a UTxO from the pending requests once its transaction was submitted.
+
+    Args:
+        key: The UTxO in tx_hash#tx_ix format.
+    """
+    def handled(self, key):
+        self.pending.pop(key, None)
+
+    """
+    Queues a UTxO as a pending request again after its transaction expired.
+
+    Args:
+        key: The UTxO in tx_hash#tx_ix format.
+    """
+    def requeue(self, key):
+        if key in self.utxos:
+            self.pending[key] = self.utxos[key]
@@ -0,0 +1,125 @@
+from helpers import MAGIC, run_cardano_cli
+from utxo import parse_utxos
+from metrics import QUEUE_DEPTH, STAGE_SECONDS, timed
+import subprocess
+import time
+
+MIN_POLL_INTERVAL = 1
+# Longest idle wait, so the first payment of a surge is seen within seconds
+MAX_POLL_INTERVAL = 5
+POLL_BACKOFF = 2
+
+"""
+Chain source querying the UTxOs of an address with cardano-cli.
+"""
+class CardanoCliSource:
+    def __init__(self, address, chain='testnet-magic'):
+        self.address = address
+        self.chain = chain
+
+    """
+    Queries the UTxOs of the address.
+
+    Returns:
+        The UTxOs in the JSON format of cardano-cli query utxo --out-file or False on error.
+    """
+    def query(self):
+        args = ['cardano-cli', 'query', 'utxo', '--address', self.address, f'--{self.chain}']
+
+        if self.chain == 'testnet-magic':
+            args.append(MAGIC)
+
+        args.append('--out-file')
+        args.append('/dev/stdout')
+
+        try:
+            tx_info = run_cardano_cli(args).stdout.decode()
+        except subprocess.CalledProcessError:
+            return False
+
+        if tx_info:
+            return tx_info
+        else:
+            return False
+
+"""
+Updates the UTxO index with new transaction info.
+
+Spent UTxOs of submitted requests are marked as confirmed in the ledger and new
+UTxOs of requests that are already in flight are not queued again.
+
+Args:
+    index: The UTxO index of the minting address.
+    tx_info: The transaction info in the JSON format of cardano-cli query utxo --out-file.
+    ledger: The ledger of processed requests.
+
+Returns:
+    A boolean indicating whether the transaction info could be parsed.
+"""
+def update_index(index, tx_info, ledger=None):
+    try:
+        added, removed = index.update(parse_utxos(tx_info))
+    except ValueError:
+        print('Error when parsing transaction info...')
+        return False
+
+    if ledger:
+        for utxo in removed:
+            ledger.confirm(utxo.key)
+
+        for utxo in added:
+            if ledger.in_flight(utxo.key):
+                index.handled(utxo.key)
+
+    return True
+
+"""
+Watches a chain source and hands new UTxOs to a handler as soon as they are seen.
+
+The source is polled again right away while the handler makes progress and with an
+exponential backoff while it is idle or failing.
+"""
+class UTxOWatcher:
+    def __init__(self, source, index, ledger=None, min_interval=MIN_POLL_INTERVAL,
+        max_interval=MAX_POLL_INTERVAL, backoff=POLL_BACKOFF):
+        self.source = source
+        self.index = index
+        self.ledger = ledger
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+
+    """
+    Polls the source once and updates the index.
+
+    Returns:
+        A boolean indicating whether the index was updated.
+    """
+    @timed(STAGE_SECONDS, stage='query')
+    def poll(self):
+        tx_info = self.source.query()
+
+        if not tx_info:
+            print('Error when querying transaction info...')
+            return False
+
+        updated = update_index(self.index, tx_info, self.ledger)
+        QUEUE_DEPTH.set(len(self.index.pending), queue='pending')
+        return updated
+
+    """
+    Runs the watcher.
+
+    Args:
+        handler: Called with the index after every poll, returns whether it made progress.
+        running: Called before every poll, the watcher stops when it returns False.
+    """
+    def run(self, handler, running):
+        while running():
+            if self.poll() and handler(self.index):
+                self.interval = self.min_interval
+                continue
+
+            time.sleep(self.interval)
+            self.interval = min(self.interval * self.backoff, self.max_interval)